@@ -0,0 +1,145 @@
+# Benchmark for weather_analytics.py
+# Builds a synthetic dataset of 10,000 locations x 168 hours (one week)
+# and times the vectorized analytics against the same computations
+# written as plain Python loops over the hourly lists. Both versions
+# must give the same results.
+#
+# Usage:
+#   python benchmark_analytics.py --locations 10000 --hours 168
+
+import time
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from weather_analytics import daily_temperature, precipitation_windows, weathercode_histogram, rankings
+
+WEATHER_CODES = [0, 1, 2, 3, 45, 61, 63, 65, 71, 95]
+
+# SYNTHETIC DATA
+
+def make_grid(locations, hours, seed=1):
+    """Random but weather-like city x hour arrays in the format of load_grid()."""
+
+    rng = np.random.default_rng(seed)
+    hour = np.arange(hours)
+
+    base = rng.uniform(-10, 30, size=(locations, 1))
+    temperature = np.round(base + 6 * np.sin(2 * np.pi * (hour - 9) / 24) + rng.normal(0, 1, (locations, hours)), 1)
+
+    # Smooth random walk, so rainy hours come in streaks
+    steps = rng.integers(-15, 16, size=(locations, hours))
+    precipitation = np.clip(50 + np.cumsum(steps, axis=1), 0, 100).astype(np.float64)
+
+    codes = np.array(WEATHER_CODES, dtype=np.int16)[rng.integers(0, len(WEATHER_CODES), size=(locations, hours))]
+
+    return {
+        "cities": np.array([f"Location {i}" for i in range(locations)]),
+        "countries": np.array(["X"] * locations),
+        "times": np.array([f"2026-02-{23 + h // 24:02d}T{h % 24:02d}:00" for h in hour]),
+        "temperature": temperature,
+        "precipitation_probability": precipitation,
+        "weathercode": codes
+    }
+
+# PYTHON LOOP VERSIONS
+
+def loop_daily_temperature(temperatures):
+    result = {"min": [], "max": [], "mean": []}
+
+    for series in temperatures:
+        mins, maxs, means = [], [], []
+
+        for day in range(0, len(series), 24):
+            values = series[day:day + 24]
+            mins.append(min(values))
+            maxs.append(max(values))
+            means.append(sum(values) / len(values))
+
+        result["min"].append(mins)
+        result["max"].append(maxs)
+        result["mean"].append(means)
+
+    return result
+
+
+def loop_precipitation_windows(probabilities, threshold=50, min_hours=3):
+    windows = []
+
+    for city, series in enumerate(probabilities):
+        start = None
+
+        for hour, value in enumerate(series + [-1]):
+            if value >= threshold and start is None:
+                start = hour
+            elif value < threshold and start is not None:
+                if hour - start >= min_hours:
+                    windows.append((city, start, hour))
+                start = None
+
+    return windows
+
+
+def loop_histogram(codes):
+    return [Counter(series) for series in codes]
+
+
+def loop_warmest(daily_means, top=10):
+    # Average of the daily means, like rankings()
+    means = [(sum(days) / len(days), city) for city, days in enumerate(daily_means)]
+    return [city for mean, city in sorted(means, key=lambda item: -item[0])[:top]]
+
+# TIMING
+
+def timed(label, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    print(f"  {label:<28}{seconds * 1000:10.1f} ms")
+    return result, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vectorized and loop based weather analytics.")
+    parser.add_argument("--locations", type=int, default=10_000)
+    parser.add_argument("--hours", type=int, default=168)
+    args = parser.parse_args()
+
+    grid = make_grid(args.locations, args.hours)
+    print(f"{args.locations:,} locations x {args.hours} hours\n")
+
+    temperatures = grid["temperature"].tolist()
+    probabilities = grid["precipitation_probability"].tolist()
+    codes = grid["weathercode"].tolist()
+
+    print("Vectorized:")
+    daily, t1 = timed("daily min/max/mean", daily_temperature, grid)
+    windows, t2 = timed("precipitation windows", precipitation_windows, grid)
+    histogram, t3 = timed("weathercode histogram", weathercode_histogram, grid)
+    ranking, t4 = timed("rankings", rankings, grid, 10, daily)
+    vectorized = t1 + t2 + t3 + t4
+
+    print("\nPython loops:")
+    loop_daily, l1 = timed("daily min/max/mean", loop_daily_temperature, temperatures)
+    loop_windows, l2 = timed("precipitation windows", loop_precipitation_windows, probabilities)
+    loop_counts, l3 = timed("weathercode histogram", loop_histogram, codes)
+    loop_top, l4 = timed("warmest ranking only", loop_warmest, loop_daily["mean"])
+    loops = l1 + l2 + l3 + l4
+
+    found, counts = histogram
+    same = (
+        np.allclose(daily["min"], loop_daily["min"])
+        and np.allclose(daily["max"], loop_daily["max"])
+        and np.allclose(daily["mean"], loop_daily["mean"])
+        and list(zip(*[part.tolist() for part in windows])) == loop_windows
+        and all({code: n for code, n in zip(found.tolist(), row) if n} == dict(counter)
+                for row, counter in zip(counts.tolist(), loop_counts))
+        and [name for name, value in ranking["warmest"]] == [f"Location {i}" for i in loop_top]
+    )
+
+    print(f"\nSpeedup: {loops / vectorized:.1f}x, same results: {same}")
+
+
+if __name__ == "__main__":
+    main()
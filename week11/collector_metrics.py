@@ -0,0 +1,105 @@
+# Metrics for one collection cycle
+# Records every HTTP response of the shared requests.Session through a
+# response hook: how long the server took to answer, how many bytes came
+# back and whether the request failed. At the end of a cycle the numbers
+# are summarized (p50/p99 latency, failures, bytes) and appended as one
+# JSON line to a metrics file, so a slow or failing API shows up there.
+
+import json
+import math
+import threading
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+# CYCLE METRICS
+
+class CycleMetrics:
+    """Collects response statistics of one cycle via a requests response hook."""
+
+    def __init__(self, cities):
+        # "lat,lon" as sent in the query -> city name, to label requests
+        self.names = {f"{city_data['lat']},{city_data['lon']}": city_data["city"] for city_data in cities}
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = datetime.now()
+            self.latencies = {}
+            self.requests = 0
+            self.failed_requests = 0
+            self.bytes = 0
+
+    def attach(self, session):
+        """Start recording the responses of a session."""
+
+        session.hooks["response"].append(self.record)
+
+    def record(self, response, *args, **kwargs):
+        """Response hook: called by requests for every response."""
+
+        size = len(response.content)
+        seconds = response.elapsed.total_seconds()
+
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+
+            if response.status_code >= 400:
+                self.failed_requests += 1
+
+            # Retries of the same city keep the latest time
+            self.latencies[self.label(response.url)] = seconds
+
+        return response
+
+    def label(self, url):
+        query = parse_qs(urlparse(url).query)
+        latitude = query.get("latitude", [""])[0]
+        longitude = query.get("longitude", [""])[0]
+
+        if "," in latitude:
+            return f"batch of {latitude.count(',') + 1}"
+
+        return self.names.get(f"{latitude},{longitude}", url)
+
+    def summary(self, cities_requested, cities_collected, cache=None):
+        """Dictionary with the metrics of the cycle."""
+
+        with self.lock:
+            latencies = sorted(self.latencies.values())
+
+            summary = {
+                "started": self.started.isoformat(timespec="seconds"),
+                "duration": round((datetime.now() - self.started).total_seconds(), 3),
+                "cities_requested": cities_requested,
+                "cities_collected": cities_collected,
+                "failures": cities_requested - cities_collected,
+                "requests": self.requests,
+                "failed_requests": self.failed_requests,
+                "bytes_received": self.bytes,
+                "latency_p50": percentile(latencies, 50),
+                "latency_p99": percentile(latencies, 99),
+                "latency": {label: round(seconds, 4) for label, seconds in self.latencies.items()}
+            }
+
+        if cache:
+            summary["cache"] = {"hits": cache.hits, "revalidated": cache.revalidated, "misses": cache.misses}
+
+        return summary
+
+    def write(self, filename, summary):
+        """Append one cycle summary as a JSON line."""
+
+        with open(filename, "a", encoding="utf-8") as file:
+            file.write(json.dumps(summary) + "\n")
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list, None if it is empty."""
+
+    if not sorted_values:
+        return None
+
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return round(sorted_values[max(rank, 1) - 1], 4)
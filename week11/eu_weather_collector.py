@@ -7,7 +7,39 @@
 import requests
 import json
 import time
+import os
+import random
+import argparse
+import threading
+from contextlib import nullcontext
 from datetime import datetime
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from weather_cache import ResponseCache, DEFAULT_TTL, DEFAULT_MAX_BYTES
+from weather_files import HOURLY_FIELDS, JsonLinesWriter, load_weather, save_compact_json, save_npz
+from weather_history import WeatherHistory
+from collector_metrics import CycleMetrics
+
+# API SETTINGS
+
+# Can point to a local server, see open_meteo_stub.py
+BASE_URL = os.environ.get("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
+# Politeness budget: one request every 0.7 seconds
+REQUEST_DELAY = 0.7
+
+# Failed requests are tried again this many times, waiting
+# RETRY_BACKOFF seconds, then twice as long, and so on
+RETRIES = 2
+RETRY_BACKOFF = 1.0
+
+# Status codes worth another try (rate limited or server trouble)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Cities asked for in one batched request (keeps the URL short enough)
+BATCH_SIZE = 100
 
 # LIST OF EU CAPITALS WITH COORDINATES
 
@@ -57,15 +89,84 @@ weather_meanings = {
 }
 
 
+# RATE LIMITER
+
+class TokenBucket:
+    """Thread-safe token bucket: rate requests per second, bursts of up to capacity."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a token is available and take it."""
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+# HTTP SESSION
+
+def make_session(pool_size=10):
+    """Create one session whose connections are reused by all requests."""
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 # FUNCTION TO REQUEST WEATHER DATA FROM API
 
-def get_weather(lat, lon):
+def get_weather(lat, lon, session=None, limiter=None, base_url=None, cache=None):
     """Send request to Open-Meteo API and return JSON data."""
 
-    base_url = "https://api.open-meteo.com/v1/forecast"
+    return request_json(base_url or BASE_URL, forecast_parameters(lat, lon), session, limiter, cache)
+
+
+def get_weather_batch(cities, session=None, limiter=None, base_url=None, cache=None):
+    """Request many cities in one call; returns one JSON result (or None) per city."""
+
+    parameters = forecast_parameters(
+        ",".join(str(city_data["lat"]) for city_data in cities),
+        ",".join(str(city_data["lon"]) for city_data in cities)
+    )
+
+    raw_data = request_json(base_url or BASE_URL, parameters, session, limiter, cache)
+
+    # Several locations come back as a list in request order,
+    # a single location as a plain object
+    if isinstance(raw_data, dict):
+        raw_data = [raw_data]
+
+    if not isinstance(raw_data, list) or len(raw_data) != len(cities):
+        return [None] * len(cities)
+
+    return [
+        result if isinstance(result, dict) and not result.get("error") else None
+        for result in raw_data
+    ]
+
+
+def forecast_parameters(lat, lon):
+    """Query parameters for today's forecast at the given coordinates."""
+
     today_date = datetime.now().strftime("%Y-%m-%d")
 
-    parameters = {
+    return {
         "latitude": lat,
         "longitude": lon,
         "current_weather": True,
@@ -75,78 +176,237 @@ def get_weather(lat, lon):
         "end_date": today_date
     }
 
-    try:
-        response = requests.get(base_url, params=parameters, timeout=10)
-        response.raise_for_status()
-        return response.json()
 
-    except requests.exceptions.RequestException as error:
-        print("Request failed:", error)
-        return None
+def request_json(url, parameters, session=None, limiter=None, cache=None):
+    """GET a JSON response, retrying with backoff on timeouts and server errors."""
+
+    http = session or requests
+    key = url + "?" + urlencode(sorted(parameters.items()))
+    cached = cache.lookup(key) if cache else None
+    headers = {}
+
+    if cached:
+        body, fresh, validators = cached
+
+        if fresh:
+            cache.count("hit")
+            return json.loads(body)
+
+        # Expired: ask the server whether our copy is still current
+        if validators["etag"]:
+            headers["If-None-Match"] = validators["etag"]
+        if validators["last_modified"]:
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    for attempt in range(RETRIES + 1):
+        # Every attempt is a request, so every attempt needs a token
+        if limiter:
+            limiter.acquire()
+
+        try:
+            response = http.get(url, params=parameters, headers=headers, timeout=10)
+
+            if response.status_code == 304 and cached:
+                cache.refresh(key, max_age(response))
+                cache.count("revalidated")
+                return json.loads(cached[0])
+
+            if response.status_code in RETRY_STATUS and attempt < RETRIES:
+                print("Server answered", response.status_code, "- retrying")
+                time.sleep(retry_delay(response, attempt))
+                continue
+
+            response.raise_for_status()
+            data = response.json()
+
+            if cache:
+                cache.store(key, response.text, response.headers.get("ETag"),
+                            response.headers.get("Last-Modified"), max_age(response))
+                cache.count("miss")
+
+            return data
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+            if attempt == RETRIES:
+                print("Request failed:", error)
+                return None
+
+            print("Request failed:", error, "- retrying")
+            time.sleep(retry_delay(None, attempt))
+
+        except (requests.exceptions.RequestException, ValueError) as error:
+            print("Request failed:", error)
+            return None
+
+
+def max_age(response):
+    """Lifetime the server gave the response in Cache-Control, or None."""
+
+    for directive in response.headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+
+        if name.lower() == "max-age" and value.isdigit():
+            return int(value)
+
+    return None
+
+
+def retry_delay(response, attempt):
+    """Seconds to wait before the next attempt, honouring Retry-After."""
+
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+
+        if retry_after.isdigit():
+            return int(retry_after)
+
+    return RETRY_BACKOFF * 2 ** attempt
 
 # MAIN COLLECTION FUNCTION
 
-def collect_weather():
+def collect_weather(base_url=None, cache=None, columnar=False, cities=None, output=None, session=None):
     """Loop through all EU capitals and gather weather data."""
 
-    final_data = {}
+    # output can be a JsonLinesWriter to write every city right away
+    final_data = {} if output is None else output
+    cities = eu_cities if cities is None else cities
+
+    # Delay to respect API rate limits: one request every REQUEST_DELAY
+    # seconds, answers from the cache do not have to wait
+    limiter = TokenBucket(1 / REQUEST_DELAY)
 
     print("Starting weather collection...\n")
 
-    for city_data in eu_cities:
-        city = city_data["city"]
-        country = city_data["country"]
-
-        print("Fetching data for:", city)
-
-        raw_data = get_weather(city_data["lat"], city_data["lon"])
-
-        if raw_data:
-            try:
-                current = raw_data.get("current_weather", {})
-                hourly = raw_data.get("hourly", {})
-
-                # Structure the data properly
-                structured = {
-                    "country": country,
-                    "coordinates": {
-                        "latitude": city_data["lat"],
-                        "longitude": city_data["lon"]
-                    },
-                    "current_weather": {
-                        "temperature": current.get("temperature"),
-                        "windspeed": current.get("windspeed"),
-                        "weathercode": current.get("weathercode"),
-                        "condition": weather_meanings.get(current.get("weathercode")),
-                        "time": current.get("time")
-                    },
-                    "hourly_forecast": []
-                }
-
-                # Add hourly forecast entries
-                if "time" in hourly:
-                    for i in range(len(hourly["time"])):
-                        structured["hourly_forecast"].append({
-                            "time": hourly["time"][i],
-                            "temperature": hourly["temperature_2m"][i],
-                            "precipitation_probability": hourly["precipitation_probability"][i],
-                            "weathercode": hourly["weathercode"][i]
-                        })
-
-                final_data[city] = structured
-                print("Success:", city)
-
-            except Exception as processing_error:
-                print("Error processing data for", city, ":", processing_error)
+    for city_data in cities:
+        print("Fetching data for:", city_data["city"])
+
+        raw_data = get_weather(city_data["lat"], city_data["lon"], session, limiter, base_url, cache)
+        add_city(final_data, city_data, raw_data, columnar)
+
+    return final_data
 
-        else:
-            print("Skipping city due to API failure.")
 
-        # Delay to respect API rate limits
-        time.sleep(0.7)
+def collect_weather_concurrent(workers=8, rate=1 / REQUEST_DELAY, burst=1, base_url=None, cache=None,
+                               columnar=False, cities=None, output=None, session=None):
+    """Fetch all EU capitals in parallel threads under a shared rate limit."""
+
+    final_data = {} if output is None else output
+    cities = eu_cities if cities is None else cities
+    limiter = TokenBucket(rate, burst)
+
+    # A session passed in (daemon mode) stays open for the next cycle
+    session_context = make_session(workers) if session is None else nullcontext(session)
+
+    print("Starting weather collection with", workers, "threads...\n")
+
+    def fetch(city_data):
+        print("Fetching data for:", city_data["city"])
+        return get_weather(city_data["lat"], city_data["lon"], session, limiter, base_url, cache)
+
+    # map() returns the results in the order of the cities,
+    # so the output is the same as in a serial run
+    with session_context as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        for city_data, raw_data in zip(cities, pool.map(fetch, cities)):
+            add_city(final_data, city_data, raw_data, columnar)
 
     return final_data
 
+
+def collect_weather_batched(batch_size=BATCH_SIZE, workers=1, rate=1 / REQUEST_DELAY, burst=1, base_url=None,
+                            cache=None, columnar=False, cities=None, output=None, session=None):
+    """Fetch the EU capitals batch_size cities per request, per city only for failures."""
+
+    final_data = {} if output is None else output
+    cities = eu_cities if cities is None else cities
+    limiter = TokenBucket(rate, burst)
+
+    # A session passed in (daemon mode) stays open for the next cycle
+    session_context = make_session(workers) if session is None else nullcontext(session)
+
+    batches = [cities[i:i + batch_size] for i in range(0, len(cities), batch_size)]
+
+    print("Starting weather collection in", len(batches), "batched requests...\n")
+
+    def fetch(batch):
+        print("Fetching data for", len(batch), "cities:", batch[0]["city"], "...", batch[-1]["city"])
+        results = get_weather_batch(batch, session, limiter, base_url, cache)
+
+        # Ask again one by one for every city the batch did not deliver
+        for i, city_data in enumerate(batch):
+            if results[i] is None:
+                print("Batch failed for", city_data["city"], "- fetching it alone")
+                results[i] = get_weather(city_data["lat"], city_data["lon"], session, limiter, base_url, cache)
+
+        return results
+
+    with session_context as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch, results in zip(batches, pool.map(fetch, batches)):
+            for city_data, raw_data in zip(batch, results):
+                add_city(final_data, city_data, raw_data, columnar)
+
+    return final_data
+
+
+def add_city(final_data, city_data, raw_data, columnar=False):
+    """Structure the API response of one city and add it to final_data."""
+
+    city = city_data["city"]
+
+    if raw_data:
+        try:
+            final_data[city] = build_city_record(city_data, raw_data, columnar)
+            print("Success:", city)
+
+        except Exception as processing_error:
+            print("Error processing data for", city, ":", processing_error)
+
+    else:
+        print("Skipping city due to API failure.")
+
+
+def build_city_record(city_data, raw_data, columnar=False):
+    """Turn the API response of one city into the structure saved to JSON."""
+
+    current = raw_data.get("current_weather", {})
+    hourly = raw_data.get("hourly", {})
+
+    # Structure the data properly
+    structured = {
+        "country": city_data["country"],
+        "coordinates": {
+            "latitude": city_data["lat"],
+            "longitude": city_data["lon"]
+        },
+        # The times below are the city's local time, this turns them into UTC
+        "utc_offset_seconds": raw_data.get("utc_offset_seconds"),
+        "current_weather": {
+            "temperature": current.get("temperature"),
+            "windspeed": current.get("windspeed"),
+            "weathercode": current.get("weathercode"),
+            "condition": weather_meanings.get(current.get("weathercode")),
+            "time": current.get("time")
+        },
+        "hourly_forecast": []
+    }
+
+    # Columnar: keep the API's arrays, one list per field
+    if columnar:
+        structured["hourly_forecast"] = {
+            name: hourly.get(api_name, []) for name, api_name in HOURLY_FIELDS.items()
+        }
+
+    # Add hourly forecast entries
+    elif "time" in hourly:
+        for i in range(len(hourly["time"])):
+            structured["hourly_forecast"].append({
+                "time": hourly["time"][i],
+                "temperature": hourly["temperature_2m"][i],
+                "precipitation_probability": hourly["precipitation_probability"][i],
+                "weathercode": hourly["weathercode"][i]
+            })
+
+    return structured
+
 # SAVE RESULTS TO JSON FILE
 
 def save_json(data, filename):
@@ -160,19 +420,190 @@ def save_json(data, filename):
     except IOError as file_error:
         print("File writing failed:", file_error)
 
+
+def save_results(data, filename, output_format="json"):
+    """Save the data as indented JSON, minified JSON ("compact") or NumPy arrays ("npz")."""
+
+    if output_format == "json":
+        save_json(data, filename)
+        return
+
+    try:
+        if output_format == "npz":
+            save_npz(data, filename)
+        else:
+            save_compact_json(data, filename)
+
+        print("\nWeather data saved to", filename)
+
+    except IOError as file_error:
+        print("File writing failed:", file_error)
+
 # PROGRAM ENTRY POINT
 
 def main():
+    parser = argparse.ArgumentParser(description="Collect weather data for all EU capitals.")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="fetch with this many threads (0 = one city after the other)")
+    parser.add_argument("--rate", type=float, default=1 / REQUEST_DELAY,
+                        help="requests per second allowed with --workers")
+    parser.add_argument("--burst", type=int, default=1,
+                        help="requests that may be sent at once with --workers")
+    parser.add_argument("--batch", type=int, nargs="?", const=BATCH_SIZE, default=0,
+                        help=f"ask for this many cities per request (default {BATCH_SIZE})")
+    parser.add_argument("--base-url", default=BASE_URL,
+                        help="forecast API address, for example a local open_meteo_stub.py")
+    parser.add_argument("--columnar", action="store_true",
+                        help="keep the hourly forecast as one list per field instead of one dict per hour")
+    parser.add_argument("--format", choices=["json", "compact", "npz"], default="json",
+                        help="indented JSON, minified JSON or NumPy .npz (implies --columnar)")
+    parser.add_argument("--output", help="output file (default eu_weather_data.json or .npz)")
+    parser.add_argument("--history", help="also add the new hours to this SQLite history store")
+    parser.add_argument("--stream", metavar="FILE.jsonl",
+                        help="write every city to this JSON Lines file as soon as it is collected; "
+                             "rerunning after a crash skips the cities already written")
+    parser.add_argument("--cache", default="weather_cache.sqlite",
+                        help="file that keeps API responses between runs")
+    parser.add_argument("--no-cache", action="store_true", help="always download everything")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL,
+                        help="seconds a response is used without asking the server again")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="largest cache size in MB, least recently used responses are removed first")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running and collect every --interval seconds (stop with Ctrl+C)")
+    parser.add_argument("--interval", type=float, default=900,
+                        help="seconds between collection cycles in --daemon mode")
+    parser.add_argument("--jitter", type=float, default=60,
+                        help="start each cycle up to this many seconds earlier or later")
+    parser.add_argument("--metrics", default="collector_metrics.jsonl",
+                        help="file that gets one line of metrics per --daemon cycle")
+    args = parser.parse_args()
+
+    cache = None
+
+    if not args.no_cache:
+        cache = ResponseCache(args.cache, args.cache_ttl, args.cache_size * 1024 * 1024)
+
     print("======================================")
     print(" EU Capitals Weather Data Collector ")
     print("======================================\n")
 
-    weather_results = collect_weather()
+    if args.daemon:
+        run_daemon(args, cache)
+    else:
+        run_collection(args, cache)
 
-    save_json(weather_results, "eu_weather_data.json")
+    if cache:
+        print(cache.summary())
+        cache.close()
 
     print("\nProcess completed.")
 
 
+def run_collection(args, cache, session=None):
+    """Collect all cities once and save the results; returns how many cities were collected."""
+
+    columnar = args.columnar or args.format == "npz"
+    output = args.output or ("eu_weather_data.npz" if args.format == "npz" else "eu_weather_data.json")
+
+    cities = eu_cities
+    writer = None
+
+    if args.stream:
+        writer = JsonLinesWriter(args.stream)
+        cities = [city_data for city_data in eu_cities if city_data["city"] not in writer.done]
+
+        if writer.done:
+            print("Resuming:", len(writer.done), "cities already written to", writer.part_filename)
+
+    if args.batch:
+        weather_results = collect_weather_batched(
+            args.batch, max(args.workers, 1), args.rate, args.burst, args.base_url, cache, columnar, cities, writer,
+            session
+        )
+    elif args.workers:
+        weather_results = collect_weather_concurrent(
+            args.workers, args.rate, args.burst, args.base_url, cache, columnar, cities, writer, session
+        )
+    else:
+        weather_results = collect_weather(args.base_url, cache, columnar, cities, writer, session)
+
+    collected = len(weather_results)
+
+    if writer:
+        writer.finish()
+        print("\nWeather data saved to", args.stream)
+    else:
+        save_results(weather_results, output, args.format)
+
+    if args.history:
+        # The streamed results are only on disk
+        if writer:
+            weather_results = load_weather(args.stream)
+
+        history = WeatherHistory(args.history)
+
+        try:
+            added = history.add_run(weather_results)
+            print("History:", added, "new hours stored,", history.hours_stored(), "in total")
+        except ValueError as error:
+            print("History not updated:", error)
+
+        history.close()
+
+    return collected
+
+# DAEMON MODE
+
+def run_daemon(args, cache):
+    """Run a collection cycle every args.interval seconds with random jitter, until Ctrl+C."""
+
+    # One session for all cycles keeps the connections (and TLS) open
+    session = make_session(max(args.workers, 1))
+    metrics = CycleMetrics(eu_cities)
+    metrics.attach(session)
+
+    # Cycles are usually shorter than the cache TTL, so without this most
+    # cycles would be answered from the cache alone and fetch (and measure)
+    # nothing; conditional requests still make unchanged data cheap
+    if cache:
+        cache.revalidate = True
+
+    next_cycle = time.monotonic()
+    cycle = 0
+
+    try:
+        while True:
+            cycle += 1
+            metrics.reset()
+
+            if cache:
+                cache.reset_counters()
+
+            print("\nCycle", cycle, "started at", datetime.now().strftime("%H:%M:%S"))
+
+            collected = run_collection(args, cache, session)
+
+            summary = metrics.summary(len(eu_cities), collected, cache)
+            summary["cycle"] = cycle
+            metrics.write(args.metrics, summary)
+
+            print("Cycle", cycle, "done:", collected, "cities,", summary["bytes_received"], "bytes, p50",
+                  summary["latency_p50"], "s, p99", summary["latency_p99"], "s")
+
+            # Keep the average pace but spread the start times,
+            # so many collectors do not hit the API at the same moment
+            next_cycle += args.interval
+            delay = next_cycle + random.uniform(-args.jitter, args.jitter) - time.monotonic()
+
+            time.sleep(max(delay, 0))
+
+    except KeyboardInterrupt:
+        print("\nDaemon stopped after", cycle, "cycles.")
+
+    finally:
+        session.close()
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
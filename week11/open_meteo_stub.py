@@ -0,0 +1,169 @@
+# Local stand-in for the Open-Meteo forecast API
+# Answers /v1/forecast with made-up but repeatable weather data,
+# so eu_weather_collector.py can be run without network access
+# and the output of different collection modes can be compared.
+#
+# Like the real API it accepts comma separated latitude and longitude
+# lists and then answers with a list of forecasts. Responses carry an
+# ETag and Last-Modified header and If-None-Match is answered with
+# 304 Not Modified, so the collector's cache can revalidate.
+#
+# Usage:
+#   python open_meteo_stub.py --port 8765 --latency 0.2 --fail-every 5
+#   python eu_weather_collector.py --base-url http://127.0.0.1:8765/v1/forecast
+
+import json
+import math
+import hashlib
+import time
+import argparse
+import threading
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WEATHER_CODES = [0, 1, 2, 3, 45, 61, 63, 65, 71, 95]
+
+# The fake data never changes while the stub runs
+STARTED = time.time()
+
+# FAKE FORECAST DATA
+
+def fake_forecast(lat, lon, day):
+    """Build a forecast response like Open-Meteo's for one location and day."""
+
+    seed = lat * 7.3 + lon * 3.1
+    times = [f"{day}T{hour:02d}:00" for hour in range(24)]
+
+    # Like timezone=auto the times are local, here simply one hour per 15°
+    offset_hours = round(lon / 15)
+
+    temperatures = [round(15 - abs(lat) / 5 + 5 * math.sin(seed + hour / 4), 1) for hour in range(24)]
+    precipitation = [int(50 + 50 * math.sin(seed * 2 + hour / 3)) for hour in range(24)]
+    codes = [WEATHER_CODES[int(seed * 10 + hour) % len(WEATHER_CODES)] for hour in range(24)]
+
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "timezone": f"GMT{offset_hours:+d}" if offset_hours else "GMT",
+        "utc_offset_seconds": offset_hours * 3600,
+        "current_weather": {
+            "temperature": temperatures[12],
+            "windspeed": round(10 + 10 * abs(math.cos(seed)), 1),
+            "weathercode": codes[12],
+            "time": f"{day}T12:00"
+        },
+        "hourly": {
+            "time": times,
+            "temperature_2m": temperatures,
+            "precipitation_probability": precipitation,
+            "weathercode": codes
+        }
+    }
+
+# REQUEST HANDLER
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves fake forecasts and fails every n-th request if asked to."""
+
+    latency = 0.0
+    fail_every = 0
+    max_locations = 0
+    max_age = 0
+    requests_seen = 0
+    not_modified = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        with self.lock:
+            StubHandler.requests_seen += 1
+            number = StubHandler.requests_seen
+
+        time.sleep(self.latency)
+
+        if url.path != "/v1/forecast":
+            self.send_json(404, {"error": True, "reason": "Not found"})
+            return
+
+        if self.fail_every and number % self.fail_every == 0:
+            self.send_json(503, {"error": True, "reason": "Try again later"})
+            return
+
+        try:
+            lats = [float(value) for value in query["latitude"][0].split(",")]
+            lons = [float(value) for value in query["longitude"][0].split(",")]
+        except (KeyError, ValueError):
+            self.send_json(400, {"error": True, "reason": "Invalid coordinates"})
+            return
+
+        if len(lats) != len(lons) or (self.max_locations and len(lats) > self.max_locations):
+            self.send_json(400, {"error": True, "reason": "Invalid number of coordinates"})
+            return
+
+        day = query.get("start_date", [datetime.now().strftime("%Y-%m-%d")])[0]
+        forecasts = [fake_forecast(lat, lon, day) for lat, lon in zip(lats, lons)]
+
+        self.send_json(200, forecasts if len(forecasts) > 1 else forecasts[0], cacheable=True)
+
+    def send_json(self, status, data, cacheable=False):
+        body = json.dumps(data).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+        if cacheable and self.headers.get("If-None-Match") == etag:
+            with self.lock:
+                StubHandler.not_modified += 1
+
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+
+        if cacheable:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.date_time_string(STARTED))
+
+            if self.max_age:
+                self.send_header("Cache-Control", f"max-age={self.max_age}")
+
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep the console quiet, the collector prints enough
+        pass
+
+# PROGRAM ENTRY POINT
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Open-Meteo forecast API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every n-th request with 503")
+    parser.add_argument("--max-locations", type=int, default=0, help="reject requests with more locations")
+    parser.add_argument("--max-age", type=int, default=0, help="Cache-Control max-age sent with forecasts")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    StubHandler.fail_every = args.fail_every
+    StubHandler.max_locations = args.max_locations
+    StubHandler.max_age = args.max_age
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    print(f"Stub forecast API on http://127.0.0.1:{args.port}/v1/forecast")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStub stopped after {StubHandler.requests_seen} requests "
+              f"({StubHandler.not_modified} answered 304).")
+
+
+if __name__ == "__main__":
+    main()
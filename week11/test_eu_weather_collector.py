@@ -0,0 +1,96 @@
+# Tests for eu_weather_collector.py against the local stub API
+# Every test starts open_meteo_stub.py's handler on a free port, so the
+# tests need no network access. Serial, concurrent and batched collection
+# must give exactly the same data, also when the stub fails requests and
+# the collector has to retry or fall back to single city requests.
+# Run with: python -m pytest week11
+
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import eu_weather_collector as collector
+from open_meteo_stub import StubHandler
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Start the stub on an ephemeral port and return its forecast URL."""
+
+    # No waiting between requests or before retries, the stub is local
+    monkeypatch.setattr(collector, "REQUEST_DELAY", 0.001)
+    monkeypatch.setattr(collector, "RETRY_BACKOFF", 0)
+
+    for name, value in (("latency", 0.0), ("fail_every", 0), ("max_locations", 0), ("max_age", 0),
+                        ("requests_seen", 0), ("not_modified", 0)):
+        monkeypatch.setattr(StubHandler, name, value)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1/forecast"
+
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def collect_serial(base_url):
+    return collector.collect_weather(base_url)
+
+
+def collect_concurrent(base_url):
+    return collector.collect_weather_concurrent(workers=8, rate=1000, burst=8, base_url=base_url)
+
+
+def collect_batched(base_url):
+    return collector.collect_weather_batched(batch_size=10, workers=2, rate=1000, burst=2, base_url=base_url)
+
+
+MODES = [collect_serial, collect_concurrent, collect_batched]
+
+
+def test_all_modes_collect_the_same_data(stub):
+    serial = collect_serial(stub)
+
+    assert list(serial) == [city_data["city"] for city_data in collector.eu_cities]
+    assert all(len(record["hourly_forecast"]) == 24 for record in serial.values())
+    assert collect_concurrent(stub) == serial
+    assert collect_batched(stub) == serial
+
+
+@pytest.mark.parametrize("collect", MODES)
+def test_failed_requests_are_retried(stub, monkeypatch, collect):
+    expected = collect_serial(stub)
+
+    # With several threads the attempts of one city may hit the failing
+    # request numbers more than once, give them enough retries
+    monkeypatch.setattr(collector, "RETRIES", 10)
+    StubHandler.fail_every = 3
+    StubHandler.requests_seen = 0
+
+    assert collect(stub) == expected
+
+    # At least one request was answered with 503 and had to be retried
+    assert StubHandler.requests_seen >= StubHandler.fail_every
+
+
+def test_rejected_batches_fall_back_to_single_cities(stub):
+    expected = collect_serial(stub)
+
+    # The stub answers 400 to the batches of 10, so every city is fetched alone
+    StubHandler.max_locations = 5
+
+    assert collect_batched(stub) == expected
+
+
+def test_retries_give_up_after_the_last_attempt(stub):
+    StubHandler.fail_every = 1
+    StubHandler.requests_seen = 0
+
+    parameters = collector.forecast_parameters(48.2, 16.37)
+
+    assert collector.request_json(stub, parameters) is None
+    assert StubHandler.requests_seen == collector.RETRIES + 1
@@ -0,0 +1,29 @@
+# Tests for weather_cache.py
+# Run with: python -m pytest week11
+
+from weather_cache import ResponseCache
+
+
+def test_entry_is_fresh_until_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=900)
+    cache.store("key", "{}", etag='"1"')
+
+    body, fresh, validators = cache.lookup("key")
+
+    assert body == "{}"
+    assert fresh
+    assert validators["etag"] == '"1"'
+    cache.close()
+
+
+def test_revalidate_treats_fresh_entries_as_stale(tmp_path):
+    # Daemon mode: a cycle shorter than the TTL must still ask the server
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=900, revalidate=True)
+    cache.store("key", "{}", etag='"1"')
+
+    body, fresh, validators = cache.lookup("key")
+
+    assert body == "{}"
+    assert not fresh
+    assert validators["etag"] == '"1"'
+    cache.close()
@@ -0,0 +1,37 @@
+# Tests for weather_files.py
+# Run with: python -m pytest week11
+
+import json
+
+from weather_files import JsonLinesWriter, load_weather
+
+
+def test_resume_repeats_a_city_that_lost_its_newline(tmp_path):
+    filename = str(tmp_path / "weather.jsonl")
+
+    # A crash cut off exactly the final newline
+    with open(filename + ".part", "w", encoding="utf-8") as file:
+        file.write(json.dumps({"Vienna": {"country": "Austria"}}) + "\n")
+        file.write(json.dumps({"Paris": {"country": "France"}}))
+
+    writer = JsonLinesWriter(filename)
+
+    assert writer.done == {"Vienna"}
+
+    writer["Paris"] = {"country": "France"}
+    writer.finish()
+
+    assert load_weather(filename) == {"Vienna": {"country": "Austria"}, "Paris": {"country": "France"}}
+
+
+def test_resume_drops_a_half_written_line(tmp_path):
+    filename = str(tmp_path / "weather.jsonl")
+
+    with open(filename + ".part", "w", encoding="utf-8") as file:
+        file.write(json.dumps({"Vienna": {"country": "Austria"}}) + "\n")
+        file.write('{"Paris": {"coun')
+
+    writer = JsonLinesWriter(filename)
+    writer.finish()
+
+    assert load_weather(filename) == {"Vienna": {"country": "Austria"}}
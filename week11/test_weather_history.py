@@ -0,0 +1,49 @@
+# Tests for weather_history.py
+# Run with: python -m pytest week11
+
+import pytest
+
+from weather_history import WeatherHistory
+
+
+def city(offset, times, temperatures):
+    return {
+        "country": "Test",
+        "coordinates": {"latitude": 0.0, "longitude": 0.0},
+        "utc_offset_seconds": offset,
+        "current_weather": {"temperature": None, "windspeed": None, "weathercode": None, "time": None},
+        "hourly_forecast": {
+            "time": times,
+            "temperature": temperatures,
+            "precipitation_probability": [0] * len(times),
+            "weathercode": [0] * len(times)
+        }
+    }
+
+
+def test_cities_at_compares_the_same_moment(tmp_path):
+    history = WeatherHistory(str(tmp_path / "history.sqlite"))
+
+    # 12:00 in Lisbon (UTC+0) is 14:00 in Helsinki (UTC+2)
+    history.add_run({
+        "Lisbon": city(0, ["2026-02-23T12:00", "2026-02-23T14:00"], [15.0, 16.0]),
+        "Helsinki": city(7200, ["2026-02-23T12:00", "2026-02-23T14:00"], [-3.0, -2.0])
+    })
+
+    assert [row[:2] for row in history.cities_at("2026-02-23T12:00")] == [("Helsinki", -2.0), ("Lisbon", 15.0)]
+    assert history.temperature_series("Helsinki") == [("2026-02-23T10:00", -3.0), ("2026-02-23T12:00", -2.0)]
+    history.close()
+
+
+def test_records_without_offset_are_rejected(tmp_path):
+    history = WeatherHistory(str(tmp_path / "history.sqlite"))
+
+    # Written before the offsets were kept: local times of an unknown zone
+    old = city(None, ["2026-02-23T12:00"], [15.0])
+    del old["utc_offset_seconds"]
+
+    with pytest.raises(ValueError, match="Lisbon"):
+        history.add_run({"Lisbon": old, "Helsinki": city(7200, ["2026-02-23T12:00"], [-3.0])})
+
+    assert history.hours_stored() == 0
+    history.close()
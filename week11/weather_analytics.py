@@ -0,0 +1,250 @@
+# Weather analytics over the collected data
+# Loads eu_weather_data.json (or the .jsonl / .npz formats) into NumPy
+# arrays indexed by city x hour and computes daily temperature
+# statistics, precipitation risk windows, weathercode histograms and
+# city rankings with whole-array operations instead of Python loops.
+#
+# Usage:
+#   python weather_analytics.py eu_weather_data.json --top 5
+
+import argparse
+import warnings
+
+import numpy as np
+
+from weather_files import MISSING_CODE, load_weather, to_columnar
+
+# LOADING
+
+def load_grid(filename):
+    """
+    Load collected data as a dictionary of city x hour arrays:
+    temperature and precipitation_probability (float, NaN = missing),
+    weathercode (int16, -1 = missing), plus cities, countries and the
+    hour labels of the first city. Cities with fewer hours are padded.
+    """
+
+    if filename.endswith(".npz"):
+        return grid_from_npz(filename)
+
+    return grid_from_data(load_weather(filename))
+
+
+def grid_from_data(data):
+    """Build the city x hour arrays from collected data (rows or columnar)."""
+
+    data = to_columnar(data)
+    records = list(data.values())
+    hours = max((len(record["hourly_forecast"]["time"]) for record in records), default=0)
+
+    grid = empty_grid(len(records), hours)
+    grid["cities"] = np.array(list(data), dtype=str)
+    grid["countries"] = np.array([record["country"] for record in records], dtype=str)
+
+    for i, record in enumerate(records):
+        hourly = record["hourly_forecast"]
+        length = len(hourly["time"])
+
+        grid["temperature"][i, :length] = numbers(hourly["temperature"])
+        grid["precipitation_probability"][i, :length] = numbers(hourly["precipitation_probability"])
+        grid["weathercode"][i, :length] = [MISSING_CODE if code is None else code for code in hourly["weathercode"]]
+
+    if records:
+        grid["times"] = np.array(records[0]["hourly_forecast"]["time"], dtype=str)
+
+    return grid
+
+
+def grid_from_npz(filename):
+    """Build the city x hour arrays straight from the flat arrays of a .npz file."""
+
+    with np.load(filename) as arrays:
+        arrays = dict(arrays)
+
+    offsets = arrays["offsets"]
+    lengths = np.diff(offsets)
+    hours = int(lengths.max()) if len(lengths) else 0
+
+    grid = empty_grid(len(lengths), hours)
+    grid["cities"] = arrays["city"]
+    grid["countries"] = arrays["country"]
+
+    # Position of every stored value in the padded city x hour grid
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    columns = np.arange(len(rows)) - np.repeat(offsets[:-1], lengths)
+
+    for name in ("temperature", "precipitation_probability", "weathercode"):
+        grid[name][rows, columns] = arrays[name]
+
+    if len(lengths):
+        grid["times"] = arrays["time"][:lengths[0]]
+
+    return grid
+
+
+def empty_grid(cities, hours):
+    return {
+        "cities": np.array([], dtype=str),
+        "countries": np.array([], dtype=str),
+        "times": np.array([], dtype=str),
+        "temperature": np.full((cities, hours), np.nan),
+        "precipitation_probability": np.full((cities, hours), np.nan),
+        "weathercode": np.full((cities, hours), MISSING_CODE, dtype=np.int16)
+    }
+
+
+def numbers(values):
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+# DAILY TEMPERATURES
+
+def by_day(values):
+    """Reshape city x hour values to city x day x 24, padding the last day with NaN."""
+
+    cities, hours = values.shape
+    days = -(-hours // 24)
+
+    if hours == days * 24:
+        return values.reshape(cities, days, 24)
+
+    padded = np.full((cities, days * 24), np.nan)
+    padded[:, :hours] = values
+
+    return padded.reshape(cities, days, 24)
+
+
+def daily_temperature(grid):
+    """Daily min, max and mean temperature, each as a city x day array."""
+
+    days = by_day(grid["temperature"])
+
+    # The NaN-aware versions are several times slower, so they
+    # are only used when values are actually missing
+    if not np.isnan(days).any():
+        return {"min": days.min(axis=2), "max": days.max(axis=2), "mean": days.mean(axis=2)}
+
+    # Days without any value give NaN, which is fine here
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        return {
+            "min": np.nanmin(days, axis=2),
+            "max": np.nanmax(days, axis=2),
+            "mean": np.nanmean(days, axis=2)
+        }
+
+# PRECIPITATION RISK
+
+def precipitation_windows(grid, threshold=50, min_hours=3):
+    """
+    Stretches of at least min_hours hours in a row with a precipitation
+    probability of threshold % or more. Returns three arrays: city index,
+    first hour and end hour (exclusive) of every window.
+    """
+
+    risky = grid["precipitation_probability"] >= threshold
+
+    # A 0 -> 1 step starts a window and a 1 -> 0 step ends it. Padding
+    # every row with zeros closes windows at the edges, and since the
+    # steps are listed row by row the starts and ends pair up.
+    padded = np.zeros((risky.shape[0], risky.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = risky
+    steps = np.diff(padded, axis=1)
+
+    city, start = np.nonzero(steps == 1)
+    end = np.nonzero(steps == -1)[1]
+
+    keep = end - start >= min_hours
+    return city[keep], start[keep], end[keep]
+
+# WEATHER CODES
+
+def weathercode_histogram(grid):
+    """
+    Hours per weathercode for every city. Returns the codes found and
+    a city x code array of counts (missing values are not counted).
+    """
+
+    codes = grid["weathercode"]
+    cities = codes.shape[0]
+
+    if codes.size == 0:
+        return np.array([], dtype=np.int16), np.zeros((cities, 0), dtype=np.int64)
+
+    # Weather codes are small numbers, so one bincount over
+    # "city * width + code" counts every city at once. Missing
+    # values (-1) land in column 0, which is dropped.
+    width = int(codes.max()) + 2
+    cells = (np.arange(cities)[:, None] * width + (codes.astype(np.int64) + 1)).ravel()
+    counts = np.bincount(cells, minlength=cities * width).reshape(cities, width)[:, 1:]
+
+    found = np.nonzero(counts.any(axis=0))[0]
+
+    return found.astype(np.int16), counts[:, found]
+
+# RANKINGS
+
+def rank_cities(grid, values, top=10, highest=True):
+    """[(city, value), ...] for the top cities by one value per city, NaN last."""
+
+    order = np.argsort(-values if highest else values, kind="stable")
+    order = order[~np.isnan(values[order])][:top]
+
+    return list(zip(grid["cities"][order].tolist(), values[order].round(1).tolist()))
+
+
+def rankings(grid, top=10, daily=None):
+    """Cross-city rankings over the whole period (daily from daily_temperature() if already computed)."""
+
+    if daily is None:
+        daily = daily_temperature(grid)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+
+        warmest = np.nanmean(daily["mean"], axis=1)
+        spread = np.nanmax(daily["max"] - daily["min"], axis=1)
+        rain = np.nanmean(grid["precipitation_probability"], axis=1)
+
+    return {
+        "warmest": rank_cities(grid, warmest, top),
+        "coldest": rank_cities(grid, warmest, top, highest=False),
+        "largest daily range": rank_cities(grid, spread, top),
+        "highest rain probability": rank_cities(grid, rain, top)
+    }
+
+# PROGRAM ENTRY POINT
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze collected weather data.")
+    parser.add_argument("filename", nargs="?", default="eu_weather_data.json")
+    parser.add_argument("--top", type=int, default=5, help="cities shown per ranking")
+    parser.add_argument("--threshold", type=float, default=50, help="precipitation probability of a risky hour")
+    parser.add_argument("--min-hours", type=int, default=3, help="shortest precipitation risk window")
+    args = parser.parse_args()
+
+    grid = load_grid(args.filename)
+    cities, hours = grid["temperature"].shape
+    print(f"Loaded {cities} cities x {hours} hours\n")
+
+    for title, ranking in rankings(grid, args.top).items():
+        print(title.capitalize() + ":")
+
+        for city, value in ranking:
+            print(f"  {city}: {value}")
+
+    city, start, end = precipitation_windows(grid, args.threshold, args.min_hours)
+    print(f"\nPrecipitation risk windows (>= {args.threshold:g}% for {args.min_hours}+ hours): {len(city)}")
+
+    for i, first, last in list(zip(city, start, end))[:args.top]:
+        print(f"  {grid['cities'][i]}: {grid['times'][first]} for {last - first} hours")
+
+    codes, counts = weathercode_histogram(grid)
+    print("\nHours per weathercode (all cities):")
+
+    for code, count in zip(codes.tolist(), counts.sum(axis=0).tolist()):
+        print(f"  {code}: {count}")
+
+
+if __name__ == "__main__":
+    main()
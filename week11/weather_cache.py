@@ -0,0 +1,144 @@
+# On-disk cache for forecast API responses
+# Used by eu_weather_collector.py so reruns (or a restart after a crash)
+# do not download the same data again. Entries are stored in a small
+# SQLite file with an expiry time, the ETag / Last-Modified validators
+# sent by the server, and the time they were last used.
+
+import time
+import sqlite3
+import threading
+
+# DEFAULT SETTINGS
+
+DEFAULT_TTL = 900
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+# RESPONSE CACHE
+
+class ResponseCache:
+    """Size-bounded LRU cache of HTTP response bodies with per-entry TTLs."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, revalidate=False):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # With revalidate every entry counts as stale, so each lookup asks the
+        # server with its validators (a cheap 304 if nothing changed)
+        self.revalidate = revalidate
+
+        # Shared by the collector threads, so every access takes the lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires REAL NOT NULL,
+                last_used REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+        # The size limit may be smaller than in the last run
+        self.evict()
+        self.connection.commit()
+
+    def lookup(self, key):
+        """Return (body, fresh, validators) for a cached key, or None."""
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT body, etag, last_modified, expires FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+
+        body, etag, last_modified, expires = row
+        fresh = not self.revalidate and expires > time.time()
+        return body, fresh, {"etag": etag, "last_modified": last_modified}
+
+    def store(self, key, body, etag=None, last_modified=None, ttl=None):
+        """Save a response body and evict the least recently used entries if too big."""
+
+        now = time.time()
+        size = len(body.encode("utf-8"))
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, now + (self.ttl if ttl is None else ttl), now, size)
+            )
+            self.evict()
+            self.connection.commit()
+
+    def refresh(self, key, ttl=None):
+        """Mark an entry fresh again after the server answered 304 Not Modified."""
+
+        now = time.time()
+
+        with self.lock:
+            self.connection.execute(
+                "UPDATE responses SET expires = ?, last_used = ? WHERE key = ?",
+                (now + (self.ttl if ttl is None else ttl), now, key)
+            )
+            self.connection.commit()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        rows = self.connection.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def count(self, result):
+        """Add one lookup result ("hit", "miss" or "revalidated") to the counters."""
+
+        with self.lock:
+            if result == "hit":
+                self.hits += 1
+            elif result == "revalidated":
+                self.revalidated += 1
+            else:
+                self.misses += 1
+
+    def reset_counters(self):
+        """Start counting from zero, for example at the start of a new daemon cycle."""
+
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.revalidated = 0
+            self.evictions = 0
+
+    def summary(self):
+        """One line with the counters for the run summary."""
+
+        return (f"Cache: {self.hits} hits, {self.revalidated} revalidated, "
+                f"{self.misses} misses, {self.evictions} evicted")
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
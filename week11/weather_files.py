@@ -0,0 +1,242 @@
+# Output formats for the collected weather data
+# The classic eu_weather_data.json has one small dictionary per city and
+# hour. In the columnar form "hourly_forecast" is one list per field
+# instead, which is much smaller on disk and in memory. It can be saved
+# as minified JSON or as a NumPy .npz file (numpy is only needed for .npz).
+# JsonLinesWriter writes each city as soon as it is collected.
+
+import os
+import json
+
+# Output field name -> field name in the API response
+HOURLY_FIELDS = {
+    "time": "time",
+    "temperature": "temperature_2m",
+    "precipitation_probability": "precipitation_probability",
+    "weathercode": "weathercode"
+}
+
+# Stored in .npz files instead of None, which NumPy numbers cannot hold
+MISSING_CODE = -1
+
+# CONVERTING BETWEEN ROWS AND COLUMNS
+
+def is_columnar(city_record):
+    """True if the hourly forecast of a city is stored as columns."""
+
+    return isinstance(city_record["hourly_forecast"], dict)
+
+
+def to_columnar(data):
+    """Return a copy of the data with every hourly forecast stored as columns."""
+
+    converted = {}
+
+    for city, record in data.items():
+        hourly = record["hourly_forecast"]
+
+        if not is_columnar(record):
+            hourly = {name: [row[name] for row in hourly] for name in HOURLY_FIELDS}
+
+        converted[city] = dict(record, hourly_forecast=hourly)
+
+    return converted
+
+
+def to_rows(data):
+    """Return a copy of the data with every hourly forecast stored as one dict per hour."""
+
+    converted = {}
+
+    for city, record in data.items():
+        hourly = record["hourly_forecast"]
+
+        if is_columnar(record):
+            # NumPy arrays (from .npz files) turn into plain Python values
+            columns = [
+                hourly[name].tolist() if hasattr(hourly[name], "tolist") else hourly[name]
+                for name in HOURLY_FIELDS
+            ]
+            hourly = [dict(zip(HOURLY_FIELDS, values)) for values in zip(*columns)]
+
+        converted[city] = dict(record, hourly_forecast=hourly)
+
+    return converted
+
+# SAVING
+
+def save_compact_json(data, filename):
+    """Save the data as minified JSON."""
+
+    with open(filename, "w", encoding="utf-8") as file:
+        json.dump(data, file, separators=(",", ":"))
+
+
+def save_npz(data, filename):
+    """Save the data as compressed NumPy arrays, all cities in one array per field."""
+
+    import numpy as np
+
+    data = to_columnar(data)
+    records = list(data.values())
+
+    # The hourly values of all cities are stored back to back,
+    # offsets[i]:offsets[i + 1] are the hours of city i
+    lengths = [len(record["hourly_forecast"]["time"]) for record in records]
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    def hourly(name):
+        return [value for record in records for value in record["hourly_forecast"][name]]
+
+    def current(name):
+        return [record["current_weather"][name] for record in records]
+
+    np.savez_compressed(
+        filename,
+        city=np.array(list(data), dtype=str),
+        country=np.array([record["country"] for record in records], dtype=str),
+        latitude=np.array([record["coordinates"]["latitude"] for record in records], dtype=np.float64),
+        longitude=np.array([record["coordinates"]["longitude"] for record in records], dtype=np.float64),
+        utc_offset_seconds=numbers([record.get("utc_offset_seconds") for record in records]),
+        current_temperature=numbers(current("temperature")),
+        current_windspeed=numbers(current("windspeed")),
+        current_weathercode=codes(current("weathercode")),
+        current_condition=texts(current("condition")),
+        current_time=texts(current("time")),
+        offsets=offsets,
+        time=texts(hourly("time")),
+        temperature=numbers(hourly("temperature")),
+        precipitation_probability=numbers(hourly("precipitation_probability")),
+        weathercode=codes(hourly("weathercode"))
+    )
+
+
+def numbers(values):
+    import numpy as np
+    return np.array([float("nan") if value is None else value for value in values], dtype=np.float64)
+
+
+def codes(values):
+    import numpy as np
+    return np.array([MISSING_CODE if value is None else value for value in values], dtype=np.int16)
+
+
+def texts(values):
+    import numpy as np
+    return np.array(["" if value is None else value for value in values], dtype=str)
+
+# LOADING
+
+def load_weather(filename):
+    """
+    Load data written by any of the save functions.
+    JSON files come back as they were saved. Hourly data from .npz files
+    stays columnar as NumPy arrays (views into one array per field).
+    """
+
+    if filename.endswith(".jsonl"):
+        data = {}
+
+        with open(filename, "r", encoding="utf-8") as file:
+            for line in file:
+                data.update(json.loads(line))
+
+        return data
+
+    if not filename.endswith(".npz"):
+        with open(filename, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    import numpy as np
+
+    with np.load(filename) as arrays:
+        arrays = dict(arrays)
+
+    offsets = arrays["offsets"]
+    data = {}
+
+    # Files written before the UTC offsets were kept do not have them
+    utc_offsets = arrays.get("utc_offset_seconds", np.full(len(arrays["city"]), np.nan))
+
+    for i, city in enumerate(arrays["city"].tolist()):
+        hours = slice(offsets[i], offsets[i + 1])
+
+        code = int(arrays["current_weathercode"][i])
+        temperature = float(arrays["current_temperature"][i])
+        windspeed = float(arrays["current_windspeed"][i])
+        utc_offset = float(utc_offsets[i])
+
+        data[city] = {
+            "country": str(arrays["country"][i]),
+            "coordinates": {
+                "latitude": float(arrays["latitude"][i]),
+                "longitude": float(arrays["longitude"][i])
+            },
+            "utc_offset_seconds": None if np.isnan(utc_offset) else int(utc_offset),
+            "current_weather": {
+                "temperature": None if np.isnan(temperature) else temperature,
+                "windspeed": None if np.isnan(windspeed) else windspeed,
+                "weathercode": None if code == MISSING_CODE else code,
+                "condition": str(arrays["current_condition"][i]) or None,
+                "time": str(arrays["current_time"][i]) or None
+            },
+            "hourly_forecast": {name: arrays[name][hours] for name in HOURLY_FIELDS}
+        }
+
+    return data
+
+# STREAMING OUTPUT
+
+class JsonLinesWriter:
+    """
+    Writes every city to a JSON Lines file as soon as it is collected.
+    Each line is a one-city object like {"Vienna": {...}}. The lines go
+    to filename + ".part" and the file only gets its real name in
+    finish(), so a crash never leaves a half written result behind, and
+    a new run with the same filename can skip the cities already done.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.part_filename = filename + ".part"
+        self.done = set()
+
+        good_size = 0
+
+        # Resume: keep every complete line of an earlier, unfinished run.
+        # A last line without its newline is cut off below even if it is
+        # valid JSON, so its city must not count as done
+        try:
+            with open(self.part_filename, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+
+                    try:
+                        self.done.update(json.loads(line))
+                    except ValueError:
+                        break
+
+                    good_size += len(line)
+
+        except FileNotFoundError:
+            pass
+
+        self.file = open(self.part_filename, "ab")
+        self.file.truncate(good_size)
+
+    def __setitem__(self, city, record):
+        line = json.dumps({city: record}, separators=(",", ":")) + "\n"
+        self.file.write(line.encode("utf-8"))
+        self.file.flush()
+        self.done.add(city)
+
+    def __len__(self):
+        return len(self.done)
+
+    def finish(self):
+        """Close the file and move it to its final name."""
+
+        self.file.close()
+        os.replace(self.part_filename, self.filename)
@@ -0,0 +1,197 @@
+# Historical weather store
+# Keeps every hour collected by eu_weather_collector.py in a SQLite file,
+# so runs add to the history instead of overwriting eu_weather_data.json.
+# Each (city, hour) is stored once: later runs only add hours that are
+# not in the store yet. The primary keys (city, time) and the index on
+# time make both kinds of queries index lookups, even over years of data.
+# Times are stored in UTC, so one hour means the same moment in every city.
+#
+# Usage:
+#   python weather_history.py weather_history.sqlite series Berlin --days 30
+#   python weather_history.py weather_history.sqlite at 2026-02-23T11:00
+
+import sqlite3
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from weather_files import to_columnar
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cities (
+    city TEXT PRIMARY KEY,
+    country TEXT,
+    latitude REAL,
+    longitude REAL
+);
+
+CREATE TABLE IF NOT EXISTS hourly (
+    city TEXT NOT NULL,
+    time TEXT NOT NULL,
+    utc_offset INTEGER NOT NULL,
+    temperature REAL,
+    precipitation_probability REAL,
+    weathercode INTEGER,
+    PRIMARY KEY (city, time)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS hourly_time ON hourly (time);
+
+CREATE TABLE IF NOT EXISTS current (
+    city TEXT NOT NULL,
+    time TEXT NOT NULL,
+    utc_offset INTEGER NOT NULL,
+    temperature REAL,
+    windspeed REAL,
+    weathercode INTEGER,
+    PRIMARY KEY (city, time)
+) WITHOUT ROWID;
+"""
+
+# The API sends times like "2026-02-23T14:00" in the city's local time.
+# They are stored in UTC in the same format, so they sort and compare
+# correctly as text, together with the city's UTC offset in seconds
+TIME_FORMAT = "%Y-%m-%dT%H:%M"
+
+# HISTORY STORE
+
+class WeatherHistory:
+    """Append-only SQLite store of collected hourly forecasts and current weather."""
+
+    def __init__(self, path="weather_history.sqlite"):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+        # Files from before the UTC change hold local times that cannot be
+        # converted any more, because the offsets were not stored
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(hourly)")]
+
+        if "utc_offset" not in columns:
+            self.connection.close()
+            raise ValueError(f"{path} stores local times without UTC offsets, please start a new history file")
+
+    def add_run(self, data):
+        """Store the result of one collection run, returns the number of new hours."""
+
+        # The collector always asks for local times (timezone=auto), so
+        # records from before the offsets were kept cannot be turned into UTC
+        missing = [city for city, record in data.items() if record.get("utc_offset_seconds") is None]
+
+        if missing:
+            raise ValueError(f"No UTC offset for {', '.join(missing)}, the local times cannot be stored")
+
+        data = to_columnar(data)
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO cities VALUES (?, ?, ?, ?)",
+                [
+                    (city, record["country"], record["coordinates"]["latitude"], record["coordinates"]["longitude"])
+                    for city, record in data.items()
+                ]
+            )
+
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO current VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (city, to_utc(current["time"], offset), offset,
+                     current["temperature"], current["windspeed"], current["weathercode"])
+                    for city, current, offset in (
+                        (city, record["current_weather"], utc_offset(record)) for city, record in data.items()
+                    )
+                    if current["time"]
+                ]
+            )
+
+            before = self.connection.total_changes
+
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO hourly VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (city, *values)
+                    for city, record in data.items()
+                    for values in hourly_rows(record["hourly_forecast"], utc_offset(record))
+                )
+            )
+
+            return self.connection.total_changes - before
+
+    def temperature_series(self, city, start=None, end=None, days=None):
+        """[(UTC time, temperature), ...] for one city, optionally limited to a UTC time range or the last days."""
+
+        if days is not None:
+            start = (datetime.now(timezone.utc) - timedelta(days=days)).strftime(TIME_FORMAT)
+
+        return self.connection.execute(
+            "SELECT time, temperature FROM hourly WHERE city = ? AND time >= ? AND time <= ? ORDER BY time",
+            (city, start or "", end or "9999")
+        ).fetchall()
+
+    def cities_at(self, time):
+        """[(city, temperature, precipitation_probability, weathercode), ...] for all cities at one UTC hour."""
+
+        return self.connection.execute(
+            "SELECT city, temperature, precipitation_probability, weathercode FROM hourly WHERE time = ? ORDER BY city",
+            (time,)
+        ).fetchall()
+
+    def hours_stored(self):
+        return self.connection.execute("SELECT COUNT(*) FROM hourly").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+def utc_offset(record):
+    """Seconds the city's times are ahead of UTC, as sent by the API."""
+
+    return record["utc_offset_seconds"]
+
+
+def to_utc(time, offset):
+    """Turn a local "2026-02-23T14:00" time into UTC in the same format."""
+
+    return (datetime.strptime(time, TIME_FORMAT) - timedelta(seconds=offset)).strftime(TIME_FORMAT)
+
+
+def hourly_rows(hourly, offset=0):
+    """(UTC time, offset, temperature, precipitation_probability, weathercode) tuples from columnar hours."""
+
+    columns = [
+        hourly[name].tolist() if hasattr(hourly[name], "tolist") else hourly[name]
+        for name in ("time", "temperature", "precipitation_probability", "weathercode")
+    ]
+
+    for time, *values in zip(*columns):
+        yield (to_utc(time, offset), offset, *values)
+
+# PROGRAM ENTRY POINT
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the historical weather store.")
+    parser.add_argument("database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    series = commands.add_parser("series", help="temperature series of one city")
+    series.add_argument("city")
+    series.add_argument("--days", type=float, help="only the last this many days")
+    series.add_argument("--start", help="first hour in UTC, for example 2026-02-01T00:00")
+    series.add_argument("--end", help="last hour in UTC")
+
+    at = commands.add_parser("at", help="all cities at one hour")
+    at.add_argument("time", help="hour in UTC, for example 2026-02-23T11:00")
+
+    args = parser.parse_args()
+    history = WeatherHistory(args.database)
+
+    if args.command == "series":
+        for time, temperature in history.temperature_series(args.city, args.start, args.end, args.days):
+            print(time, temperature)
+    else:
+        for city, temperature, precipitation, code in history.cities_at(args.time):
+            print(f"{city}: {temperature} °C, {precipitation}% rain, code {code}")
+
+    history.close()
+
+
+if __name__ == "__main__":
+    main()
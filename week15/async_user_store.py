@@ -0,0 +1,90 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from user_store import UserStore
+
+
+#AsyncUserStore gives the UserStore methods to async def routes
+#the blocking sqlite3 calls run on executors owned by the store instead
+#of FastAPI's shared threadpool:
+#all writes go through one writer thread, its queue keeps them in order
+#and no write waits for the database lock held by another write,
+#reads run in parallel on their own threads (WAL lets them read while
+#the writer writes)
+class AsyncUserStore:
+
+    #constructor
+    #wraps a UserStore, every executor thread gets its own connection from it
+    def __init__(self, store: UserStore, readers: int = 8):
+        self.store = store
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self.readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-reader")
+
+    #runs a blocking store call on one of the executors
+    async def run(self, executor: ThreadPoolExecutor, method, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(method, *args))
+
+    #stops the executors and closes the connections of the store
+    def close(self):
+        self.writer.shutdown(wait=True)
+        self.readers.shutdown(wait=True)
+        self.store.close()
+
+    #only reads counters in memory, no need for a thread
+    def cache_stats(self) -> dict:
+        return self.store.cache_stats()
+
+    #reads
+
+    async def load(self) -> list[dict]:
+        return await self.run(self.readers, self.store.load)
+
+    async def load_page(self, after_id: int = 0, limit: int = 100,
+                        fields: list[str] | None = None) -> tuple[list[dict], int | None]:
+        return await self.run(self.readers, self.store.load_page, after_id, limit, fields)
+
+    async def find_by_id(self, user_id: int) -> dict | None:
+        return await self.run(self.readers, self.store.find_by_id, user_id)
+
+    async def find_by_email(self, email: str) -> dict | None:
+        return await self.run(self.readers, self.store.find_by_email, email)
+
+    async def search(self, text: str, limit: int = 20, offset: int = 0) -> tuple[list[dict], bool]:
+        return await self.run(self.readers, self.store.search, text, limit, offset)
+
+    #async version of UserStore.iter_users, fetches the rows in batches
+    #on the reader threads and yields them one at a time
+    async def iter_users(self, after_id: int = 0, limit: int | None = None,
+                         fields: list[str] | None = None, batch_size: int = 500):
+        users = self.store.iter_users(after_id, limit, fields, batch_size)
+
+        try:
+            while batch := await self.run(self.readers, lambda: list(islice(users, batch_size))):
+                for user in batch:
+                    yield user
+        finally:
+            #closes the connection of iter_users if the client stopped early
+            await self.run(self.readers, users.close)
+
+    #writes
+
+    async def save(self, user: dict) -> int:
+        return await self.run(self.writer, self.store.save, user)
+
+    async def save_many(self, users: list[dict]) -> list[int | None]:
+        return await self.run(self.writer, self.store.save_many, users)
+
+    async def update_user(self, user_id: int, updated_data: dict) -> bool:
+        return await self.run(self.writer, self.store.update_user, user_id, updated_data)
+
+    async def update_many(self, updates: list[dict]) -> list[str]:
+        return await self.run(self.writer, self.store.update_many, updates)
+
+    async def delete_user(self, user_id: int) -> bool:
+        return await self.run(self.writer, self.store.delete_user, user_id)
+
+    async def delete_many(self, user_ids: list[int]) -> list[bool]:
+        return await self.run(self.writer, self.store.delete_many, user_ids)
@@ -0,0 +1,134 @@
+#benchmark for the full-text user search
+#fills a database with generated users (5 million by default) through
+#UserStore.save_many, so the search index is built by the triggers like
+#in the app, then times UserStore.search for typical queries: a full
+#name, a name and the beginning of another word, a last name, the
+#beginning of a last name and a whole email
+#
+#building 5 million users takes a few minutes, the database is kept
+#and reused by later runs with the same --database
+#
+#usage (from the week15 folder):
+#    python benchmark_search.py --users 5000000 --queries 2000
+
+import os
+import time
+import random
+import argparse
+
+from user_store import UserStore
+
+SYLLABLES = [
+    "al", "an", "ar", "be", "bo", "ca", "da", "de", "el", "en", "fa", "ga", "ha", "in", "ja", "ka",
+    "la", "le", "li", "ma", "mi", "na", "ne", "no", "ol", "pa", "ra", "re", "ri", "ro", "sa", "se",
+    "ta", "te", "ti", "to", "va", "ve", "wa", "ya", "za", "zo", "ber", "dor", "ger", "han", "kin",
+    "lor", "man", "mer", "nor", "son", "ston", "ton", "win"
+]
+
+DOMAINS = ["example.com", "mail.org", "post.de", "web.net", "inbox.eu"]
+
+
+#a list of made up names from 2 or 3 syllables
+def make_names(count: int, rng: random.Random) -> list[str]:
+    names = set()
+
+    while len(names) < count:
+        parts = rng.choices(SYLLABLES, k=rng.choice((2, 3)))
+        names.add("".join(parts).capitalize())
+
+    return sorted(names)
+
+
+#adds generated users until the database has the requested number
+def fill(store: UserStore, users: int, first_names: list[str], last_names: list[str], rng: random.Random):
+    with store.connection() as conn:
+        start = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    if start >= users:
+        return
+
+    print(f"adding {users - start:,} users ...")
+    began = time.perf_counter()
+
+    for first in range(start, users, 100_000):
+        batch = []
+
+        for number in range(first, min(first + 100_000, users)):
+            name = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+            email = f"{name.replace(' ', '.').lower()}{number}@{rng.choice(DOMAINS)}"
+            batch.append({"name": name, "email": email})
+
+        store.save_many(batch)
+
+    print(f"done in {time.perf_counter() - began:.0f} s\n")
+
+
+#queries a user would type, built from the names of random stored users
+def make_queries(store: UserStore, count: int, users: int, rng: random.Random) -> dict:
+    queries = {
+        "full name": [],
+        "name + prefix": [],
+        "last name": [],
+        "last name prefix": [],
+        "email": []
+    }
+
+    for _ in range(count // len(queries)):
+        user = store.find_by_id(rng.randint(1, users))
+        first, last = user["name"].split()
+
+        queries["full name"].append(user["name"])
+        queries["name + prefix"].append(f"{first} {last[:3]}")
+        queries["last name"].append(last)
+        queries["last name prefix"].append(last[:4])
+        queries["email"].append(user["email"])
+
+    return queries
+
+
+#nearest rank percentile of a sorted list
+def percentile(values: list[float], percent: float) -> float:
+    return values[max(int(len(values) * percent / 100 + 0.5), 1) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time full-text user search.")
+    parser.add_argument("--users", type=int, default=5_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--database", default="search_benchmark.db")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    first_names = make_names(2_000, rng)
+    last_names = make_names(50_000, rng)
+
+    store = UserStore(args.database)
+    fill(store, args.users, first_names, last_names, rng)
+
+    print(f"{args.users:,} users, database {os.path.getsize(args.database) / 1e6:,.0f} MB\n")
+    print(f"{'query':<20}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'avg hits':>10}{'truncated':>11}")
+
+    for kind, texts in make_queries(store, args.queries, args.users, rng).items():
+        timings = []
+        hits = 0
+        truncated = 0
+
+        for text in texts:
+            start = time.perf_counter()
+            users, cut = store.search(text, limit=20)
+            timings.append((time.perf_counter() - start) * 1000)
+
+            hits += len(users)
+            truncated += cut
+
+        timings.sort()
+        print(
+            f"{kind:<20}{percentile(timings, 50):10.2f}{percentile(timings, 99):10.2f}"
+            f"{timings[-1]:10.2f}{hits / len(texts):10.1f}{truncated / len(texts):10.0%}"
+        )
+
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#load benchmark for the UserStore connection handling
+#runs the same mix of reads, updates and inserts once with a new
+#connection per call (the old behaviour) and once with the pooled
+#per-thread connections and pragmas, first as store calls from a
+#thread pool and then through the FastAPI routes in routes/users.py,
+#and prints the throughput of both
+#
+#usage (from the week15 folder):
+#    python benchmark_store.py --clients 32 --requests 3000
+
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from async_user_store import AsyncUserStore
+from user_store import UserStore
+
+
+#fills a fresh database with some users
+#the read cache is switched off, this compares how connections are
+#handled and cached reads would not touch the database at all
+def prepare_store(path: str, pooled: bool, users: int) -> UserStore:
+    store = UserStore(path, pooled=pooled, cache_size=0)
+
+    for number in range(users):
+        store.save({"name": f"User {number}", "email": f"user{number}@example.com"})
+
+    return store
+
+
+#the same workload as direct store calls
+def store_worker(store: UserStore, requests: int, users: int, rng: random.Random):
+    for _ in range(requests):
+        choice = rng.random()
+
+        if choice < 0.7:
+            store.find_by_id(rng.randint(1, users))
+        elif choice < 0.9:
+            user_id = rng.randint(1, users)
+            store.update_user(user_id, {"name": f"Renamed {user_id}", "email": f"renamed{user_id}@example.com"})
+        else:
+            store.save({"name": "New user", "email": f"new{rng.random()}@example.com"})
+
+
+#runs the store workload on a thread pool and returns calls per second
+def run_store(store: UserStore, clients: int, requests: int, users: int) -> float:
+    per_client = requests // clients
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for future in [
+            pool.submit(store_worker, store, per_client, users, random.Random(number)) for number in range(clients)
+        ]:
+            future.result()
+
+    return per_client * clients / (time.perf_counter() - start)
+
+
+#every client sends its share of requests one after the other:
+#mostly reads, some updates and some inserts
+async def client(http: httpx.AsyncClient, requests: int, users: int, rng: random.Random):
+    for _ in range(requests):
+        choice = rng.random()
+
+        if choice < 0.7:
+            response = await http.get("/users")
+        elif choice < 0.9:
+            user_id = rng.randint(1, users)
+            response = await http.put(
+                f"/users/{user_id}",
+                json={"name": f"Renamed {user_id}", "email": f"renamed{user_id}@example.com"}
+            )
+        else:
+            response = await http.post("/users", json={"name": "New user", "email": f"new{rng.random()}@example.com"})
+
+        response.raise_for_status()
+
+
+#runs the workload against the app and returns requests per second
+async def run_http(store: UserStore, clients: int, requests: int, users: int) -> float:
+    #imported here and not at the top: routes.users opens USERS_DB as soon
+    #as it is imported, which main() points to a temporary file first
+    import routes.users
+    from main import app
+
+    #the routes use the module level store, so swap it for this run
+    app_store = routes.users.store
+    routes.users.store = async_store = AsyncUserStore(store)
+
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+        per_client = requests // clients
+        start = time.perf_counter()
+
+        await asyncio.gather(*[
+            client(http, per_client, users, random.Random(number)) for number in range(clients)
+        ])
+
+        seconds = time.perf_counter() - start
+
+    async_store.close()
+    routes.users.store = app_store
+    return per_client * clients / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare connection per call with pooled connections.")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=3000)
+    #GET /users returns every user, keep the table small so the
+    #benchmark measures the database and not the JSON encoding
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients, {args.requests} requests, {args.users} users\n")
+
+    #the app's own database, so users.db in this folder is not changed
+    with tempfile.TemporaryDirectory() as app_folder:
+        os.environ["USERS_DB"] = os.path.join(app_folder, "users.db")
+
+        for title, runner in (("Store calls:", run_store), ("HTTP routes:", run_http)):
+            print(title)
+            results = {}
+
+            with tempfile.TemporaryDirectory() as folder:
+                for label, pooled in (("connection per call", False), ("pooled connections", True)):
+                    #separate files, WAL mode stays switched on in a database file
+                    store = prepare_store(os.path.join(folder, f"{pooled}.db"), pooled, args.users)
+
+                    if runner is run_http:
+                        results[label] = asyncio.run(runner(store, args.clients, args.requests, args.users))
+                    else:
+                        results[label] = runner(store, args.clients, args.requests, args.users)
+
+                    store.close()
+                    print(f"  {label:<22}{results[label]:10.0f} requests/s")
+
+            speedup = results["pooled connections"] / results["connection per call"]
+            print(f"  {speedup:.1f}x the throughput\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#load test for the app in main.py
+#starts the app with uvicorn in a temporary folder (so users.db here is
+#not touched), adds some users through POST /users/batch and then sends
+#a mix of reads and writes at a fixed rate for a while
+#requests start on schedule whether earlier ones have finished or not
+#(like independent users), so slow requests show up as latency instead
+#of silently lowering the rate
+#--import adds slow writes: a client that keeps importing batches of
+#users through POST /users/batch during the test
+#prints the achieved rate and p50/p99 latency per kind of request
+#
+#usage (from the week15 folder):
+#    python load_test.py --rate 200 --duration 20
+#    python load_test.py --rate 200 --import 5000
+#    python load_test.py --url http://127.0.0.1:8000    (a running server)
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+#kind of request -> share of the traffic, 80 % reads and 20 % writes
+MIX = {
+    "GET /users": 0.20,
+    "GET /users/search": 0.20,
+    "GET /users/by-email": 0.20,
+    "GET /users/{id}": 0.20,
+    "POST /users": 0.10,
+    "PUT /users/{id}": 0.10,
+}
+
+
+#starts uvicorn with main:app and waits until it answers
+def start_server(port: int, folder: str) -> subprocess.Popen:
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--app-dir", app_dir, "main:app",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=folder
+    )
+
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/users?limit=1")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+#adds users with one batch request, returns their IDs
+def seed(url: str, users: int, run: str) -> list[int]:
+    body = "\n".join(
+        json.dumps({"name": f"Load User{number}", "email": f"load{number}.{run}@example.com"})
+        for number in range(users)
+    )
+    response = httpx.post(f"{url}/users/batch", content=body, timeout=300)
+    response.raise_for_status()
+
+    return [json.loads(line)["id"] for line in response.text.splitlines()]
+
+
+#sends one request of the given kind
+async def request(http: httpx.AsyncClient, kind: str, ids: list[int], run: str, rng: random.Random):
+    user_id = rng.choice(ids)
+
+    if kind == "GET /users":
+        return await http.get("/users", params={"after_id": user_id, "limit": 50})
+    if kind == "GET /users/search":
+        return await http.get("/users/search", params={"q": f"load user{user_id % 1000}"})
+    if kind == "GET /users/{id}":
+        #skewed like real traffic: most requests are for a few hot users
+        hot = ids[rng.randrange(min(100, len(ids)))] if rng.random() < 0.9 else user_id
+        return await http.get(f"/users/{hot}")
+    if kind == "GET /users/by-email":
+        return await http.get("/users/by-email", params={"email": f"load{user_id % len(ids)}.{run}@example.com"})
+    if kind == "POST /users":
+        return await http.post("/users", json={"name": "New User", "email": f"new{rng.random()}.{run}@example.com"})
+
+    return await http.put(
+        f"/users/{user_id}",
+        json={"name": f"Load User{user_id}", "email": f"changed{user_id}.{run}@example.com"}
+    )
+
+
+#sends one request and records its latency (including waiting for a connection)
+async def timed(http, kind, ids, run_id, rng, latencies, errors):
+    start = time.perf_counter()
+    response = await request(http, kind, ids, run_id, rng)
+    latencies[kind].append(time.perf_counter() - start)
+
+    #404 from by-email is fine, the email may have been changed by a PUT
+    if response.status_code >= 500 or response.status_code in (400, 409, 422):
+        errors[kind] = errors.get(kind, 0) + 1
+
+
+#imports batches of users one after the other until stop_at
+async def importer(http: httpx.AsyncClient, batch: int, run_id: str, stop_at: float, latencies: dict):
+    number = 0
+
+    while time.perf_counter() < stop_at:
+        body = "\n".join(
+            json.dumps({"name": "Imported User", "email": f"import{number + i}.{run_id}@example.com"})
+            for i in range(batch)
+        )
+        number += batch
+
+        start = time.perf_counter()
+        response = await http.post("/users/batch", content=body)
+        response.raise_for_status()
+        latencies.setdefault("POST /users/batch", []).append(time.perf_counter() - start)
+
+
+#starts requests at random (Poisson) intervals with the given average rate
+async def run(url: str, rate: float, duration: float, clients: int, import_batch: int,
+              ids: list[int], run_id: str) -> tuple[dict, dict, float]:
+    latencies = {kind: [] for kind in MIX}
+    errors = {}
+    kinds, weights = list(MIX), list(MIX.values())
+    rng = random.Random(1)
+    limits = httpx.Limits(max_connections=clients)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as http:
+        tasks = []
+        start = time.perf_counter()
+        next_at = start
+
+        if import_batch:
+            tasks.append(asyncio.create_task(importer(http, import_batch, run_id, start + duration, latencies)))
+
+        while next_at < start + duration:
+            await asyncio.sleep(max(next_at - time.perf_counter(), 0))
+            kind = rng.choices(kinds, weights)[0]
+            tasks.append(asyncio.create_task(timed(http, kind, ids, run_id, rng, latencies, errors)))
+            next_at += rng.expovariate(rate)
+
+        await asyncio.gather(*tasks)
+
+    return latencies, errors, time.perf_counter() - start
+
+
+#nearest rank percentile of a sorted list, in milliseconds
+def percentile(values: list[float], percent: float) -> float:
+    return values[max(int(len(values) * percent / 100 + 0.5), 1) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed read/write load test for the users API.")
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=200, help="requests per second")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=64, help="open connections at most")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--import", dest="import_batch", type=int, default=0,
+                        help="users per batch of a bulk import running during the test")
+    args = parser.parse_args()
+
+    #emails have to be unique, so every run uses its own
+    run_id = str(int(time.time()))
+
+    with tempfile.TemporaryDirectory() as folder:
+        server = None if args.url else start_server(args.port, folder)
+        url = args.url or f"http://127.0.0.1:{args.port}"
+
+        try:
+            ids = seed(url, args.users, run_id)
+            latencies, errors, seconds = asyncio.run(
+                run(url, args.rate, args.duration, args.clients, args.import_batch, ids, run_id)
+            )
+            cache = httpx.get(f"{url}/users/cache-stats").json()
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    #the import is reported on its own line, not in the totals
+    imports = latencies.pop("POST /users/batch", [])
+    total = sum(len(values) for values in latencies.values())
+    print(f"{args.rate:g} requests/s wanted, {total / seconds:.0f} requests/s done in {seconds:.1f} s\n")
+    print(f"{'request':<24}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+
+    for kind, values in list(latencies.items()) + [("all", sum(latencies.values(), []))]:
+        values.sort()
+
+        if values:
+            print(
+                f"{kind:<24}{len(values):8}{percentile(values, 50):10.1f}{percentile(values, 99):10.1f}"
+                f"{errors.get(kind, sum(errors.values()) if kind == 'all' else 0):8}"
+            )
+
+    print(f"\ncache hit rate: users {cache['users']['hit_rate']}, pages {cache['pages']['hit_rate']}")
+
+    if imports:
+        imports.sort()
+        print(f"import batches of {args.import_batch}: {len(imports)}, p50 {percentile(imports, 50):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
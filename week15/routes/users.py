@@ -1,35 +1,285 @@
-from fastapi import APIRouter, HTTPException
-from user_store import UserStore
+import os
+import json
+import tempfile
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from async_user_store import AsyncUserStore
+from user_store import SEARCH_RANK_LIMIT, DuplicateEmailError, UserStore, select_fields
 
 #Create a router instance for user related endpoints
 router = APIRouter()
 
 #initialize the UserStore with the file that will store user data
-store = UserStore("users.db")
+#the async wrapper runs writes on one writer thread and reads in parallel,
+#so the async routes never block the event loop
+#USERS_DB can point it to another file, for example in benchmarks
+store = AsyncUserStore(UserStore(os.environ.get("USERS_DB", "users.db")))
+
+#lines of a batch request that are written in one transaction
+BATCH_SIZE = 1000
+
+
+#turns the comma separated fields parameter into a list
+def parse_fields(fields: str | None) -> list[str] | None:
+    if not fields:
+        return None
+
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+#encodes users from an async iterator to a JSON array one row at a time
+async def stream_json(users):
+    yield "["
+
+    number = 0
+
+    async for user in users:
+        yield ("," if number else "") + json.dumps(user)
+        number += 1
 
+    yield "]"
 
-# GET /users
-# Returns all users stored in the file
+
+# GET /users?after_id=&limit=&fields=id,name
+# Without after_id and limit returns the list of all users like before,
+# streamed as one JSON array that is encoded while the rows are read
+# With after_id or limit returns one page of users ordered by ID and the
+# after_id of the next page: {"users": [...], "next_after_id": ...}
+# stream=true returns every user after after_id (up to limit) as a list
 @router.get("/users")
-def get_users():
-    #Load all users from the file and return them
-    return store.load()
+async def get_users(
+    after_id: int | None = Query(None, ge=0),
+    limit: int | None = Query(None, ge=1),
+    fields: str | None = None,
+    stream: bool = False
+):
+    selected = parse_fields(fields)
+
+    try:
+        if stream or (after_id is None and limit is None):
+            #the generator only runs once the response is sent, so check the fields first
+            select_fields(selected)
+
+            return StreamingResponse(
+                stream_json(store.iter_users(after_id or 0, limit, selected)),
+                media_type="application/json"
+            )
+
+        users, next_after_id = await store.load_page(after_id or 0, min(limit or 100, 1000), selected)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+    return {"users": users, "next_after_id": next_after_id}
+
+
+# GET /users/search?q=&limit=&offset=
+# Full-text search over name and email, best matches first
+# every word of q has to match, the last one may be incomplete ("alice smi")
+# truncated=true means q matches so many users that only part of them
+# were ranked (see SEARCH_RANK_LIMIT), a longer q gives better results
+@router.get("/users/search")
+async def search_users(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    users, truncated = await store.search(q, limit, offset)
+
+    #a full page means there may be more matches, but only the first
+    #SEARCH_RANK_LIMIT matches are ranked, there are no pages after them
+    next_offset = offset + limit if len(users) == limit and offset + limit < SEARCH_RANK_LIMIT else None
+
+    return {"users": users, "next_offset": next_offset, "truncated": truncated}
+
+
+# GET /users/by-email?email=
+# Returns the user with this email (case does not matter)
+@router.get("/users/by-email")
+async def get_user_by_email(email: str):
+    user = await store.find_by_email(email)
+
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return user
+
+
+# GET /users/cache-stats
+# Hit, miss and eviction counters of the user and page caches,
+# a low hit rate with many evictions means the caches are too small
+@router.get("/users/cache-stats")
+async def get_cache_stats():
+    return store.cache_stats()
+
+
+# GET /users/{user_id}
+# Returns one user by ID (answered from the cache for recently read users)
+@router.get("/users/{user_id}")
+async def get_user(user_id: int):
+    user = await store.find_by_id(user_id)
+
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return user
 
 
 # POST /users
 # Create a new user
+# 422 if name or email is missing or not a string, 409 if the email is taken
 @router.post("/users")
-def create_user(user: dict):
-    store.save(user)
-    return {"message": "User created"}
+async def create_user(user: dict):
+    error = check_item(user, ("name", "email"))
+
+    if error:
+        raise HTTPException(status_code=422, detail=error)
+
+    try:
+        user_id = await store.save(user)
+    except DuplicateEmailError:
+        raise HTTPException(status_code=409, detail="Email already exists")
+
+    return {"message": "User created", "id": user_id}
     
 
+#reads a newline delimited JSON body line by line as it arrives
+#yields (line number, parsed value or None if the line is not valid JSON)
+async def read_ndjson(request: Request):
+    buffer = b""
+    number = 0
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+
+        for line in lines:
+            if line.strip():
+                number += 1
+                yield number, parse_line(line)
+
+    if buffer.strip():
+        yield number + 1, parse_line(buffer)
+
+
+def parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+#checks one line of a batch request, returns an error message or None
+def check_item(item, keys: tuple[str, ...]) -> str | None:
+    if not isinstance(item, dict):
+        return "Invalid JSON object"
+
+    missing = [key for key in keys if key not in item]
+
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+
+    if "id" in keys and not isinstance(item["id"], int):
+        return "id must be an integer"
+
+    if any(not isinstance(item[key], str) for key in keys if key != "id"):
+        return "name and email must be strings"
+
+    return None
+
+
+#runs a batch request: valid lines are passed to the async store method in
+#chunks of BATCH_SIZE (one transaction each), and one result per line
+#is written to a temporary file, so neither the request nor the results
+#are held in memory, then the results are streamed back as NDJSON
+async def run_batch(request: Request, keys: tuple[str, ...], method, make_result):
+    results = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", encoding="utf-8")
+    pending = []
+
+    #invalid lines wait in pending too, so the results keep the input order
+    async def flush():
+        outcomes = iter(await method([item for number, item, error in pending if not error]))
+
+        for number, item, error in pending:
+            if error:
+                result = {"line": number, "status": "error", "detail": error}
+            else:
+                result = {"line": number, **make_result(item, next(outcomes))}
+
+            results.write(json.dumps(result) + "\n")
+
+        pending.clear()
+
+    async for number, item in read_ndjson(request):
+        pending.append((number, item, check_item(item, keys)))
+
+        if len(pending) >= BATCH_SIZE:
+            await flush()
+
+    if pending:
+        await flush()
+
+    results.seek(0)
+
+    #send blocks instead of single lines, every step of a
+    #sync iterator is a separate trip to the thread pool
+    def blocks():
+        with results:
+            while block := results.read(64 * 1024):
+                yield block
+
+    return StreamingResponse(blocks(), media_type="application/x-ndjson")
+
+
+# POST /users/batch
+# Creates many users from NDJSON lines {"name": ..., "email": ...}
+# Returns one NDJSON line per input line with the new id, "conflict" or an error
+@router.post("/users/batch")
+async def create_users(request: Request):
+    return await run_batch(
+        request, ("name", "email"),
+        lambda users: store.save_many(users),
+        lambda user, user_id: {"id": user_id, "status": "created"} if user_id else {"status": "conflict"}
+    )
+
+
+# PUT /users/batch
+# Updates many users from NDJSON lines {"id": ..., "name": ..., "email": ...}
+@router.put("/users/batch")
+async def update_users(request: Request):
+    return await run_batch(
+        request, ("id", "name", "email"),
+        lambda users: store.update_many(users),
+        lambda user, status: {"id": user["id"], "status": status}
+    )
+
+
+# DELETE /users/batch
+# Deletes many users from NDJSON lines {"id": ...}
+@router.delete("/users/batch")
+async def delete_users(request: Request):
+    return await run_batch(
+        request, ("id",),
+        lambda users: store.delete_many([user["id"] for user in users]),
+        lambda user, success: {"id": user["id"], "status": "deleted" if success else "not found"}
+    )
+
+
 # PUT /users/{user_id}
 # Updates an existing user by ID
+# 422 if name or email is missing or not a string, 409 if the email is taken
 @router.put("/users/{user_id}")
-def update_user(user_id: int, updated_data: dict):
+async def update_user(user_id: int, updated_data: dict):
+    error = check_item(updated_data, ("name", "email"))
+
+    if error:
+        raise HTTPException(status_code=422, detail=error)
+
     # Call the UserStore update method
-    success = store.update_user(user_id, updated_data)
+    try:
+        success = await store.update_user(user_id, updated_data)
+    except DuplicateEmailError:
+        raise HTTPException(status_code=409, detail="Email already exists")
 
     # If no user was found with that ID return 404
     if not success:
@@ -41,9 +291,9 @@ def update_user(user_id: int, updated_data: dict):
 # DELETE /users/{user_id}
 # Deletes a user by ID
 @router.delete("/users/{user_id}")
-def delete_user(user_id: int):
+async def delete_user(user_id: int):
     # Call the UserStore delete method
-    success = store.delete_user(user_id)
+    success = await store.delete_user(user_id)
 
     # If no user was found with that ID return 404
     if not success:
@@ -0,0 +1,88 @@
+#tests for UserStore, every test uses its own database file
+#run with: python -m pytest week15
+
+import pytest
+
+import user_store
+from user_store import UserStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"))
+    yield store
+    store.close()
+
+
+#pages of a truncated search are cut from the same ranked matches,
+#so no user comes back twice and there are no pages past the limit
+def test_search_pages_rank_the_same_matches(store, monkeypatch):
+    monkeypatch.setattr(user_store, "SEARCH_RANK_LIMIT", 10)
+
+    store.save_many([{"name": f"Maria Garcia Lopez{number}", "email": f"m{number}@x.com"} for number in range(12)])
+    store.save_many([{"name": "Maria", "email": f"e{number}@x.com"} for number in range(3)])
+
+    pages = [store.search("maria", limit=4, offset=offset) for offset in (0, 4, 8, 12)]
+    ids = [user["id"] for users, truncated in pages for user in users]
+
+    assert ids == list(range(1, 11))
+    assert all(truncated for users, truncated in pages)
+
+
+#below the limit every match is ranked, exact names first
+def test_search_ranks_all_matches_below_the_limit(store):
+    store.save_many([{"name": f"Maria Garcia Lopez{number}", "email": f"m{number}@x.com"} for number in range(12)])
+    store.save({"name": "Maria", "email": "maria@x.com"})
+
+    users, truncated = store.search("maria", limit=4)
+
+    assert users[0]["id"] == 13
+    assert not truncated
+
+
+#every user gets its own ID, None if the email is taken by an existing
+#user or an earlier line of the same batch (case only matters outside ASCII)
+def test_save_many_returns_ids_in_input_order(store):
+    store.save({"name": "Existing", "email": "Ä@x.com"})
+
+    ids = store.save_many([
+        {"name": "A", "email": "a@x.com"},
+        {"name": "Same email, other case", "email": "A@X.COM"},
+        {"name": "Taken", "email": "Ä@x.com"},
+        {"name": "Not the same for NOCASE", "email": "ä@x.com"},
+        {"name": "B", "email": "b@x.com"},
+    ])
+
+    #skipped lines may use up IDs, so only the order of the new ones is fixed
+    assert [user_id is None for user_id in ids] == [False, True, True, False, False]
+    assert ids[0] < ids[3] < ids[4]
+    assert [store.find_by_id(ids[index])["email"] for index in (0, 3, 4)] == ["a@x.com", "ä@x.com", "b@x.com"]
+
+
+def test_update_many_reports_every_update(store):
+    store.save_many([
+        {"name": "One", "email": "Ä@x.com"},
+        {"name": "Two", "email": "ä@x.com"},
+        {"name": "Three", "email": "c@x.com"},
+    ])
+
+    results = store.update_many([
+        {"id": 1, "name": "One", "email": "ä@x.com"},
+        {"id": 3, "name": "Three", "email": "C@x.com"},
+        {"id": 2, "name": "Two", "email": "a@x.com"},
+        {"id": 2, "name": "Two", "email": "c@x.com"},
+        {"id": 99, "name": "Nobody", "email": "n@x.com"},
+    ])
+
+    #user 1 keeps Ä@x.com (ä@x.com belongs to user 2), user 3 only changes
+    #case, the last update of user 2 collides with user 3
+    assert results == ["conflict", "updated", "updated", "conflict", "not found"]
+    assert [store.find_by_id(user_id)["email"] for user_id in (1, 2, 3)] == ["Ä@x.com", "a@x.com", "C@x.com"]
+
+
+def test_delete_many_deletes_each_id_once(store):
+    store.save_many([{"name": f"User {number}", "email": f"u{number}@x.com"} for number in range(3)])
+
+    assert store.delete_many([2, 99, 2, 1]) == [True, False, False, True]
+    assert store.find_by_id(1) is None
+    assert store.find_by_id(3) is not None
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+#LRUCache keeps recently used values in memory for UserStore
+#bounded size: the least recently used entry is evicted when it is full
+#ttl: entries older than ttl seconds are treated as missing, so data
+#changed by another process is picked up after ttl at the latest
+#thread safe, the store is used from several threads at once
+class LRUCache:
+
+    #constructor
+    #max_size=0 turns the cache off
+    def __init__(self, max_size: int = 10_000, ttl: float = 30.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  #key -> (time stored, value), oldest first
+        self.lock = threading.Lock()
+
+        #increases with every invalidation, see put()
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    #returns (True, value) if key is cached and fresh, otherwise (False, None)
+    def get(self, key) -> tuple[bool, object]:
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self.entries[key]
+                self.expired += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return False, None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    #stores a value read from the database
+    #version is self.version from before the read: if anything was
+    #invalidated in the meantime the value may already be outdated,
+    #so it is not stored
+    def put(self, key, value, version: int):
+        if self.max_size <= 0:
+            return
+
+        with self.lock:
+            if version != self.version:
+                return
+
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    #removes some keys after a write
+    def invalidate(self, *keys):
+        with self.lock:
+            self.version += 1
+
+            for key in keys:
+                self.entries.pop(key, None)
+
+    #removes everything after a write
+    def clear(self):
+        with self.lock:
+            self.version += 1
+            self.entries.clear()
+
+    #counters for the stats endpoint, to see if the size and ttl fit the traffic
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
@@ -1,4 +1,161 @@
+import re
 import sqlite3
+import threading
+from contextlib import contextmanager
+
+from user_cache import LRUCache
+
+
+#settings applied to every pooled connection
+#WAL lets readers work while a write is in progress,
+#synchronous=NORMAL is safe with WAL and avoids an fsync per commit,
+#mmap and a bigger page cache make reads cheaper,
+#busy_timeout makes a writer wait for the lock instead of failing
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "busy_timeout": 5000,
+}
+
+#schema changes, applied in order by init_db
+#PRAGMA user_version stores how many of them a database already has,
+#so every migration runs exactly once per database file
+#only ever append to this list, never change an existing entry
+MIGRATIONS = [
+    #1: the users table
+    [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL
+        )
+        """,
+    ],
+    #2: unique emails, compared without case, also makes lookups by email an index search
+    [
+        "CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email COLLATE NOCASE)",
+    ],
+    #3: full-text search over name and email
+    #external content: the index reads the text from users instead of
+    #storing a second copy, the triggers keep it in sync with every write
+    #prefix indexes make "ali*" style queries as fast as whole words
+    #@ and . are part of words, so an email is one word and "alice@ex"
+    #looks up one prefix instead of matching "example" and "com" in
+    #a large part of all users
+    [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            name, email,
+            content='users', content_rowid='id',
+            tokenize="unicode61 remove_diacritics 2 tokenchars '@.'",
+            prefix='2 3 4'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, name, email) VALUES (new.id, new.name, new.email);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, email) VALUES ('delete', old.id, old.name, old.email);
+            INSERT INTO users_fts (rowid, name, email) VALUES (new.id, new.name, new.email);
+        END
+        """,
+        #index the users that already exist
+        "INSERT INTO users_fts (users_fts) VALUES ('rebuild')",
+    ],
+]
+
+
+#raised when a user would get an email that another user already has
+class DuplicateEmailError(Exception):
+    pass
+
+
+#search ranks every match when there are at most this many
+#ranking has to score each match, so a short prefix that matches a large
+#part of all users would take hundreds of milliseconds over millions of
+#rows (also with ORDER BY rank inside FTS5), above the limit only the
+#first matches by ID are ranked and the result says it is truncated (the
+#client should ask for more letters)
+#every page of a query is cut from the same ranked matches, so there are
+#no pages past this many results
+SEARCH_RANK_LIMIT = 2000
+
+#columns a client can ask for with field selection
+USER_FIELDS = ("id", "name", "email")
+
+
+#checks the requested field names, None means all fields
+#raises ValueError for unknown fields
+def select_fields(fields: list[str] | None) -> list[str]:
+    if not fields:
+        return list(USER_FIELDS)
+
+    unknown = [field for field in fields if field not in USER_FIELDS]
+
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    #keep the column order of the table, without duplicates
+    return [field for field in USER_FIELDS if field in fields]
+
+
+#turns free text into an FTS5 query: every word has to match, the last
+#one may be incomplete like while typing ("alice smi" finds "Alice Smith")
+#the earlier words are whole words, an open prefix on every word made
+#queries over millions of users several times slower
+#words are split like the index splits them and quoted, so FTS5
+#operators typed by a user are plain text
+#returns None if there is nothing to search for
+def search_query(text: str) -> str | None:
+    words = [word.strip("@.") for word in re.findall(r"[\w@.]+", text)]
+    words = [word for word in words if word]
+
+    if not words:
+        return None
+
+    return " ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+
+
+#returns the IDs from ids that exist in the users table
+#looks them up in chunks to stay below SQLite's limit on query parameters
+def existing_ids(cursor: sqlite3.Cursor, ids: list[int], chunk_size: int = 500) -> set[int]:
+    found = set()
+
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        cursor.execute(
+            f"SELECT id FROM users WHERE id IN ({', '.join('?' * len(chunk))})",
+            chunk
+        )
+        found.update(row[0] for row in cursor.fetchall())
+
+    return found
+
+
+#returns {id: email} for the given IDs, in chunks like existing_ids
+def email_by_id(cursor: sqlite3.Cursor, ids: list[int], chunk_size: int = 500) -> dict[int, str]:
+    emails = {}
+
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        cursor.execute(
+            f"SELECT id, email FROM users WHERE id IN ({', '.join('?' * len(chunk))})",
+            chunk
+        )
+        emails.update(cursor.fetchall())
+
+    return emails
 
 
 #UserStore does all database operations related to users
@@ -7,32 +164,107 @@ class UserStore:
 
     #constructor
     #accepts a database path and initializes database
-    def __init__(self, db_path: str):
+    #every thread gets one connection that is kept open and reused,
+    #pooled=False opens a new connection for every call (the old behaviour)
+    #find_by_id and load_page answer from in-memory caches of cache_size
+    #entries each (0 turns them off), every write here invalidates them,
+    #writes by other processes are seen after cache_ttl seconds
+    def __init__(self, db_path: str, pooled: bool = True,
+                 cache_size: int = 10_000, cache_ttl: float = 30.0):
         self.db_path = db_path
+        self.pooled = pooled
+
+        #user id -> user, (after_id, limit, fields) -> page
+        #cached values are shared, callers must not change them
+        self.user_cache = LRUCache(cache_size, cache_ttl)
+        self.page_cache = LRUCache(cache_size, cache_ttl)
+
+        #one connection per thread, all of them are kept for close()
+        self.local = threading.local()
+        self.connections = []
+        self.connections_lock = threading.Lock()
+
         self.init_db()  #make sure table exists when the class is created
 
-    #creates the users table if it does not already exist
+    #opens a connection for the calling thread and applies the pragmas
+    def open_connection(self) -> sqlite3.Connection:
+        #check_same_thread=False only so close() can close every connection,
+        #each connection is still used by one thread only
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+
+        for name, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+        with self.connections_lock:
+            self.connections.append(conn)
+
+        self.local.conn = conn
+        return conn
+
+    #gives the calling thread its connection inside a transaction
+    #that is committed at the end of the block (rolled back on errors)
+    @contextmanager
+    def connection(self):
+        if not self.pooled:
+            conn = sqlite3.connect(self.db_path)
+
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+            return
+
+        conn = getattr(self.local, "conn", None) or self.open_connection()
+
+        with conn:
+            yield conn
+
+    #closes all pooled connections, for example when the app shuts down
+    def close(self):
+        with self.connections_lock:
+            for conn in self.connections:
+                conn.close()
+
+            self.connections = []
+
+        self.local = threading.local()
+
+    #called after every committed write with the IDs it changed
+    #any write can move users between pages, so all pages are dropped
+    def invalidate(self, *user_ids: int):
+        self.user_cache.invalidate(*user_ids)
+        self.page_cache.clear()
+
+    #hit, miss and eviction counters of both caches
+    def cache_stats(self) -> dict:
+        return {"users": self.user_cache.stats(), "pages": self.page_cache.stats()}
+
+    #brings the database schema up to date by running the missing migrations
     #method runs automatically when application starts
     def init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self.connection() as conn:
+            #take the write lock first, so two processes starting at the
+            #same time cannot both run the same migration
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
 
-            #create users table with id, name, and email
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    email TEXT NOT NULL
-                )
-            """)
+            for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+                try:
+                    for statement in statements:
+                        conn.execute(statement)
+                except sqlite3.IntegrityError as error:
+                    raise RuntimeError(f"Migration {number} failed on existing data: {error}") from error
 
-            #Save changes to the database
-            conn.commit()
+                #user_version is part of the transaction, it only
+                #changes if all statements of the migration succeed
+                conn.execute(f"PRAGMA user_version = {number}")
 
     #Retrieves all users from the database
     #Returns a list of dictionaries
     def load(self) -> list[dict]:
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connection() as conn:
             cursor = conn.cursor()
 
             #Fetch all rows from users table
@@ -45,24 +277,252 @@ class UserStore:
                 for row in rows
             ]
 
+    #Retrieves one page of users ordered by ID, starting after after_id
+    #WHERE id > ? uses the primary key, so every page is as fast as the first
+    #Returns the users and the after_id of the next page (None on the last page)
+    def load_page(self, after_id: int = 0, limit: int = 100,
+                  fields: list[str] | None = None) -> tuple[list[dict], int | None]:
+        columns = select_fields(fields)
+
+        key = (after_id, limit, tuple(columns))
+        found, page = self.page_cache.get(key)
+
+        if found:
+            return page
+
+        #taken before the read, see LRUCache.put
+        version = self.page_cache.version
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+
+            #id is always selected for the cursor, even if it is not returned
+            cursor.execute(
+                f"SELECT id, {', '.join(columns)} FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)
+            )
+            rows = cursor.fetchall()
+
+        users = [dict(zip(columns, row[1:])) for row in rows]
+
+        #a full page means there may be more users after the last one
+        next_after_id = rows[-1][0] if len(rows) == limit else None
+
+        self.page_cache.put(key, (users, next_after_id), version)
+        return users, next_after_id
+
+    #Yields users ordered by ID one at a time, straight from the cursor,
+    #so the whole table is never held in memory
+    #uses its own connection because a streaming response may pull
+    #the rows from different threads
+    def iter_users(self, after_id: int = 0, limit: int | None = None,
+                   fields: list[str] | None = None, batch_size: int = 500):
+        columns = select_fields(fields)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+
+        try:
+            cursor = conn.cursor()
+
+            #LIMIT -1 means no limit in SQLite
+            cursor.execute(
+                f"SELECT {', '.join(columns)} FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, -1 if limit is None else limit)
+            )
+
+            while rows := cursor.fetchmany(batch_size):
+                for row in rows:
+                    yield dict(zip(columns, row))
+        finally:
+            conn.close()
+
+    #Searches name and email with the full-text index, best matches first
+    #Returns one page of users (offset skips the pages before it) and
+    #whether the ranking was truncated, see SEARCH_RANK_LIMIT
+    #offsets past SEARCH_RANK_LIMIT return no users
+    def search(self, text: str, limit: int = 20, offset: int = 0) -> tuple[list[dict], bool]:
+        query = search_query(text)
+
+        if query is None:
+            return [], False
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+
+            #one pass over the matches: reading one more than the limit
+            #tells if there are more, otherwise these are all of them
+            #rank is the bm25 score of the match, lower is better
+            #the limit does not depend on offset, so all pages rank the same rows
+            cursor.execute(
+                "SELECT rowid, rank FROM users_fts WHERE users_fts MATCH ? LIMIT ?",
+                (query, SEARCH_RANK_LIMIT + 1)
+            )
+            matches = cursor.fetchall()
+
+            truncated = len(matches) > SEARCH_RANK_LIMIT
+            ranked = sorted(matches[:SEARCH_RANK_LIMIT], key=lambda match: (match[1], match[0]))
+            page = ranked[offset:offset + limit]
+            ids = [rowid for rowid, rank in page]
+
+            cursor.execute(
+                f"SELECT id, name, email FROM users WHERE id IN ({', '.join('?' * len(ids))})",
+                ids
+            )
+            rows = {row[0]: row for row in cursor.fetchall()}
+
+        users = [
+            {"id": rows[user_id][0], "name": rows[user_id][1], "email": rows[user_id][2]}
+            for user_id in ids
+        ]
+
+        return users, truncated
+
     #inserts a new user into the database
     #Accepts a dictionary containing name and email
-    def save(self, user: dict) -> None:
-        with sqlite3.connect(self.db_path) as conn:
+    #Returns the new ID, raises DuplicateEmailError if the email is taken
+    def save(self, user: dict) -> int:
+        with self.connection() as conn:
             cursor = conn.cursor()
 
-            #Insert new user record
+            #Insert new user record, the unique email index decides about
+            #conflicts in the same statement (no separate check that
+            #another request could race with)
             cursor.execute(
-                "INSERT INTO users (name, email) VALUES (?, ?)",
+                "INSERT INTO users (name, email) VALUES (?, ?) ON CONFLICT DO NOTHING",
                 (user["name"], user["email"])
             )
 
             conn.commit()
 
+            if cursor.rowcount == 0:
+                raise DuplicateEmailError(user["email"])
+
+            self.invalidate(cursor.lastrowid)
+            return cursor.lastrowid
+
+    #inserts many users with one executemany in a single transaction,
+    #so a batch costs one commit instead of one per user
+    #Returns the new IDs in the same order as the users,
+    #None for users whose email is already taken
+    def save_many(self, users: list[dict]) -> list[int | None]:
+        if not users:
+            return []
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+
+            #the write lock is taken before reading the highest ID,
+            #so every row with a higher ID is inserted by this batch
+            cursor.execute("BEGIN IMMEDIATE")
+            before = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0]
+
+            cursor.executemany(
+                "INSERT INTO users (name, email) VALUES (?, ?) ON CONFLICT DO NOTHING",
+                [(user["name"], user["email"]) for user in users]
+            )
+
+            cursor.execute("SELECT id, email FROM users WHERE id > ? ORDER BY id", (before,))
+            inserted = cursor.fetchall()
+
+        self.invalidate(*[row[0] for row in inserted])
+
+        #rows were inserted in input order and skipped users left no row,
+        #so walking both lists together gives every user its ID
+        #(a skipped email can never be the email of a later inserted row)
+        #a row keeps the email exactly as given, so compare exactly: the
+        #index's NOCASE only folds ASCII letters, str.lower() folds more
+        ids = []
+        position = 0
+
+        for user in users:
+            if position < len(inserted) and inserted[position][1] == user["email"]:
+                ids.append(inserted[position][0])
+                position += 1
+            else:
+                ids.append(None)
+
+        return ids
+
+    #updates many users (dictionaries with id, name and email) in a single transaction
+    #Returns "updated", "not found" or "conflict" (email taken by another user) per user
+    def update_many(self, updates: list[dict]) -> list[str]:
+        if not updates:
+            return []
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+
+            #executemany only reports the total rowcount, so look up
+            #which IDs exist first (same transaction, so it cannot change)
+            cursor.execute("BEGIN IMMEDIATE")
+            found = existing_ids(cursor, [user["id"] for user in updates])
+
+            #OR IGNORE skips rows that would break the unique email index
+            #instead of aborting the whole batch
+            cursor.executemany(
+                "UPDATE OR IGNORE users SET name = ?, email = ? WHERE id = ?",
+                [(user["name"], user["email"], user["id"]) for user in updates if user["id"] in found]
+            )
+
+            emails = email_by_id(cursor, list(found))
+
+        self.invalidate(*found)
+
+        #a skipped update left the old email in place, an ID listed more
+        #than once is compared with its last update only
+        #(exact comparison, a skipped change of case only is a conflict too)
+        last = {user["id"]: index for index, user in enumerate(updates)}
+        results = []
+
+        for index, user in enumerate(updates):
+            if user["id"] not in found:
+                results.append("not found")
+            elif last[user["id"]] == index and emails[user["id"]] != user["email"]:
+                results.append("conflict")
+            else:
+                results.append("updated")
+
+        return results
+
+    #deletes many users by ID in a single transaction
+    #Returns True or False per ID, like delete_user
+    def delete_many(self, user_ids: list[int]) -> list[bool]:
+        if not user_ids:
+            return []
+
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            found = existing_ids(cursor, user_ids)
+
+            cursor.executemany(
+                "DELETE FROM users WHERE id = ?",
+                [(user_id,) for user_id in found]
+            )
+
+        self.invalidate(*found)
+
+        #an ID listed twice is only deleted by its first entry
+        results = []
+
+        for user_id in user_ids:
+            results.append(user_id in found)
+            found.discard(user_id)
+
+        return results
+
     #Finds a user by their ID
     # Returns a dictionary if found otherwise None
+    #answers from the cache if the user was read recently
     def find_by_id(self, user_id: int) -> dict | None:
-        with sqlite3.connect(self.db_path) as conn:
+        found, user = self.user_cache.get(user_id)
+
+        if found:
+            return user
+
+        #taken before the read, see LRUCache.put
+        version = self.user_cache.version
+
+        with self.connection() as conn:
             cursor = conn.cursor()
 
             #Query database for specific user ID
@@ -75,24 +535,54 @@ class UserStore:
 
             #If a row is found then convert to dictionary
             if row:
-                return {"id": row[0], "name": row[1], "email": row[2]}
+                user = {"id": row[0], "name": row[1], "email": row[2]}
+                self.user_cache.put(user_id, user, version)
+                return user
 
             #If no user found return None
             return None
 
+    #Finds a user by email, compared without case like the unique index
+    # Returns a dictionary if found otherwise None
+    def find_by_email(self, email: str) -> dict | None:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+
+            #COLLATE NOCASE matches the index, so this is an index search
+            cursor.execute(
+                "SELECT id, name, email FROM users WHERE email = ? COLLATE NOCASE",
+                (email,)
+            )
+
+            row = cursor.fetchone()
+
+            if row:
+                return {"id": row[0], "name": row[1], "email": row[2]}
+
+            return None
+
     #Updates an existing user by ID
     #Returns True if update was successful, otherwise False.
+    #raises DuplicateEmailError if another user has the new email,
+    #other constraint errors (a NULL name or email) are raised as they are
     def update_user(self, user_id: int, updated_data: dict) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connection() as conn:
             cursor = conn.cursor()
 
-            #update user record
-            cursor.execute(
-                "UPDATE users SET name = ?, email = ? WHERE id = ?",
-                (updated_data["name"], updated_data["email"], user_id)
-            )
+            #update user record, the unique index rejects a taken email
+            try:
+                cursor.execute(
+                    "UPDATE users SET name = ?, email = ? WHERE id = ?",
+                    (updated_data["name"], updated_data["email"], user_id)
+                )
+            except sqlite3.IntegrityError as error:
+                if not str(error).startswith("UNIQUE constraint failed"):
+                    raise
+
+                raise DuplicateEmailError(updated_data["email"]) from None
 
             conn.commit()
+            self.invalidate(user_id)
 
             # rowcount > 0 means a record was updated
             return cursor.rowcount > 0
@@ -100,7 +590,7 @@ class UserStore:
     #deletes a user by ID.
     #Returns True if deletion was successful or else False.
     def delete_user(self, user_id: int) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connection() as conn:
             cursor = conn.cursor()
 
             #delete user record
@@ -110,6 +600,7 @@ class UserStore:
             )
 
             conn.commit()
+            self.invalidate(user_id)
 
             #rowcount > 0 means a record was deleted
             return cursor.rowcount > 0
\ No newline at end of file
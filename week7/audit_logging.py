@@ -0,0 +1,264 @@
+"""
+Audit logging for the log analyzer.
+
+By default every message is written straight to analysis_audit.log and
+the console, which means a log full of junk lines turns into a flood of
+disk and console writes inside the parse loop. configure_logging() can
+change that in two ways:
+
+- Rate limiting: messages tagged with an audit key (see MALFORMED and
+  INCIDENT) are let through up to burst times per interval, the rest
+  are only counted and summarized in one line such as
+  "Skipped 48,213 malformed lines in the last 10s".
+- Asynchronous mode: the parse loop only puts records on a bounded
+  queue, and a background thread (QueueListener) does the writing.
+  When the queue is full the record is dropped and counted instead of
+  making the parse loop wait.
+"""
+
+import time
+import queue
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+AUDIT_FILE = "analysis_audit.log"
+AUDIT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Pass as extra= to tag a message for rate limiting
+MALFORMED = {"audit_key": "malformed"}
+INCIDENT = {"audit_key": "incident"}
+
+# Audit key -> summary for the messages held back in one interval
+SUMMARIES = {
+    "malformed": "Skipped {count:,} malformed lines in the last {seconds:g}s",
+    "incident": "Suppressed {count:,} more security incident messages in the last {seconds:g}s"
+}
+
+# The active configuration, see configure_logging()
+current = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets the first burst messages of every audit key through in each
+    interval. Later ones are counted, and one summary per key is
+    logged when the interval is over. Messages without an audit key
+    always pass.
+
+    The summary is written by the first message after the interval
+    (or by flush()), so no timer thread is needed.
+    """
+
+    def __init__(self, interval=10.0, burst=5):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+
+        # audit key -> messages seen in the current interval
+        self.seen = {}
+        self.aggregated = 0
+
+    def filter(self, record):
+        key = getattr(record, "audit_key", None)
+        now = time.monotonic()
+
+        with self.lock:
+            summaries = self.end_window(now) if now - self.window_start >= self.interval else []
+
+            passed = True
+
+            if key is not None:
+                count = self.seen.get(key, 0) + 1
+                self.seen[key] = count
+
+                if count > self.burst:
+                    self.aggregated += 1
+                    passed = False
+
+        self.write(summaries)
+        return passed
+
+    def end_window(self, now):
+        """
+        Starts a new interval and returns the summaries of the last one.
+        """
+        seconds = round(now - self.window_start, 1)
+        summaries = [
+            SUMMARIES.get(key, "Suppressed {count:,} '" + key + "' messages in the last {seconds:g}s")
+            .format(count=count - self.burst, seconds=seconds)
+            for key, count in self.seen.items() if count > self.burst
+        ]
+
+        self.seen = {}
+        self.window_start = now
+
+        return summaries
+
+    def flush(self):
+        """
+        Writes the summaries for the current interval right away.
+        """
+        with self.lock:
+            summaries = self.end_window(time.monotonic())
+
+        self.write(summaries)
+
+    def write(self, summaries):
+        # Summaries have no audit key, so they pass this filter
+        for message in summaries:
+            logging.getLogger().warning(message)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks: records that do not fit in the
+    queue are dropped and counted.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AuditLogging:
+    """
+    The logging setup made by configure_logging().
+    Call close() at the end to write the last summaries and
+    wait for the background thread to finish writing.
+    """
+
+    def __init__(self, asynchronous=False, interval=None, burst=5,
+                 queue_size=10000, filename=AUDIT_FILE):
+        self.asynchronous = asynchronous
+        self.interval = interval
+        self.burst = burst
+
+        # Counts taken over from worker processes
+        self.worker_aggregated = 0
+
+        formatter = logging.Formatter(AUDIT_FORMAT)
+        self.handlers = [logging.FileHandler(filename), logging.StreamHandler()]
+
+        for handler in self.handlers:
+            handler.setFormatter(formatter)
+
+        root = logging.getLogger()
+
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+
+        # Also drops a limiter copied from the parent into a worker
+        for old in root.filters[:]:
+            if isinstance(old, RateLimitFilter):
+                root.removeFilter(old)
+
+        root.setLevel(logging.INFO)
+
+        # The filter sits on the logger, so held back messages are
+        # thrown away before a handler or the queue ever sees them
+        self.limiter = RateLimitFilter(interval, burst) if interval else None
+
+        if self.limiter:
+            root.addFilter(self.limiter)
+
+        self.queue_handler = None
+        self.listener = None
+
+        if asynchronous:
+            self.queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+            self.listener = QueueListener(self.queue_handler.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+            root.addHandler(self.queue_handler)
+        else:
+            for handler in self.handlers:
+                root.addHandler(handler)
+
+    def stats(self):
+        """
+        Number of messages summarized by the rate limit (aggregated)
+        and lost because the queue was full (dropped).
+        """
+        return {
+            "aggregated": (self.limiter.aggregated if self.limiter else 0) + self.worker_aggregated,
+            "dropped": self.queue_handler.dropped if self.queue_handler else 0
+        }
+
+    def worker_settings(self):
+        """
+        Settings for worker processes. They log synchronously, the
+        queue thread only exists in this process.
+        """
+        return {"interval": self.interval, "burst": self.burst}
+
+    def close(self):
+        root = logging.getLogger()
+
+        if self.limiter:
+            self.limiter.flush()
+
+        stats = self.stats()
+        root.info(f"Audit log: {stats['aggregated']:,} messages aggregated, {stats['dropped']:,} dropped.")
+
+        if self.listener:
+            # Switch back to writing directly, then let the thread
+            # write everything still in the queue
+            root.removeHandler(self.queue_handler)
+            self.listener.stop()
+
+            for handler in self.handlers:
+                root.addHandler(handler)
+
+        if self.limiter:
+            root.removeFilter(self.limiter)
+
+
+def configure_logging(asynchronous=False, interval=None, burst=5, queue_size=10000, filename=AUDIT_FILE):
+    """
+    Replaces the handlers of the root logger with the audit log setup.
+    interval=None turns rate limiting off. Returns the AuditLogging
+    object, which is also kept in audit_logging.current.
+    """
+    global current
+
+    current = AuditLogging(asynchronous, interval, burst, queue_size, filename)
+    return current
+
+
+def configure_worker_logging(settings):
+    """
+    Initializer for worker processes: synchronous logging
+    with the same rate limit as the main process.
+    """
+    configure_logging(**settings)
+
+
+def collect_worker_stats():
+    """
+    Called in a worker when its task is done: writes the pending
+    summaries and returns the aggregated count since the last call.
+    """
+    if current is None or current.limiter is None:
+        return 0
+
+    current.limiter.flush()
+
+    aggregated = current.limiter.aggregated
+    current.limiter.aggregated = 0
+
+    return aggregated
+
+
+def add_worker_stats(aggregated):
+    if current is not None:
+        current.worker_aggregated += aggregated
@@ -0,0 +1,107 @@
+"""
+Benchmark for the LogAnalyzer line parser.
+
+Generates an Apache-style log with a few million lines (including a
+small share of malformed lines), then times parse_entry(), which
+returns LogEntry records, against parse_line(), which turns each of
+them into a dictionary, and finally a full analyze_logs() run.
+
+A split/partition based parser was tried as well, but on CPython it
+was never faster than the C regex engine, so only the regex is used.
+
+Usage:
+    python benchmark_parsers.py --lines 2000000
+"""
+
+import os
+import random
+import time
+import argparse
+import logging
+import tempfile
+
+from log_analyzer import LogAnalyzer
+
+
+METHODS = ["GET", "GET", "GET", "POST", "PUT", "DELETE"]
+URLS = ["/index.html", "/login", "/admin", "/about.html", "/contact", "/products?id=42", "/api/items"]
+STATUSES = [200, 200, 200, 200, 301, 401, 403, 404, 500]
+
+
+def generate_log(path, lines, seed=1):
+    """
+    Writes a synthetic log file. Roughly one line in a thousand is malformed.
+    """
+    rng = random.Random(seed)
+
+    with open(path, "w") as file:
+        for number in range(lines):
+            if rng.random() < 0.001:
+                file.write("malformed line without the expected fields\n")
+                continue
+
+            ip = f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+            second = number % 86400
+            timestamp = f"20/Feb/2026:{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}"
+
+            file.write(
+                f'{ip} - - [{timestamp}] "{rng.choice(METHODS)} {rng.choice(URLS)} HTTP/1.1" '
+                f'{rng.choice(STATUSES)} {rng.randint(100, 50000)}\n'
+            )
+
+
+def time_parsing(path, parse):
+    """
+    Times only the line parser, without statistics or security checks.
+    """
+    parsed = 0
+
+    start = time.perf_counter()
+
+    with open(path, "r") as file:
+        for line in file:
+            if parse(line.strip()):
+                parsed += 1
+
+    return time.perf_counter() - start, parsed
+
+
+def time_analysis(path):
+    """
+    Times a complete analyze_logs() run.
+    """
+    analyzer = LogAnalyzer(path)
+
+    start = time.perf_counter()
+    analyzer.analyze_logs()
+
+    return time.perf_counter() - start, analyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the log line parser.")
+    parser.add_argument("--lines", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    # Malformed lines and incidents would otherwise flood the console
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "benchmark.log")
+
+        print(f"Generating {args.lines:,} log lines...")
+        generate_log(path, args.lines)
+
+        baseline, parsed = time_parsing(path, LogAnalyzer(path).parse_line)
+        print(f"{'dict':>6}: parse {baseline:7.2f}s  (parse_line, {parsed:,} valid lines)")
+
+        parse_time, parsed = time_parsing(path, LogAnalyzer(path).parse_entry)
+        print(f"{'entry':>6}: parse {parse_time:7.2f}s  (parse_entry, {parsed:,} valid lines)")
+
+        analysis_time, analyzer = time_analysis(path)
+        print(f"\nFull analysis: {analysis_time:.2f}s for {analyzer.total_requests:,} requests")
+        print(f"Parse speedup over parse_line: {baseline / parse_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
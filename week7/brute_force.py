@@ -0,0 +1,110 @@
+import time
+import calendar
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+
+@lru_cache(maxsize=512)
+def day_start(day):
+    """
+    Seconds since the epoch (UTC) at midnight of a day like "20/Feb/2026".
+    strptime is slow, but a log only contains a handful of different
+    days, so the cache means it runs once per day instead of per line.
+    """
+    return calendar.timegm(time.strptime(day, "%d/%b/%Y"))
+
+
+def parse_timestamp(timestamp):
+    """
+    Converts an Apache timestamp like "20/Feb/2026:20:10:12" or
+    "10/Oct/2000:13:55:36 -0700" to seconds since the epoch (UTC).
+    Raises ValueError for anything else.
+    """
+    if len(timestamp) < 20 or timestamp[11] != ":" or timestamp[14] != ":" or timestamp[17] != ":":
+        raise ValueError(f"Unexpected timestamp format: {timestamp}")
+
+    seconds = (
+        day_start(timestamp[:11])
+        + int(timestamp[12:14]) * 3600
+        + int(timestamp[15:17]) * 60
+        + int(timestamp[18:20])
+    )
+
+    # Optional time zone offset such as " -0700"
+    zone = timestamp[20:].strip()
+
+    if zone:
+        if len(zone) != 5 or zone[0] not in "+-":
+            raise ValueError(f"Unexpected time zone: {zone}")
+
+        offset = int(zone[1:3]) * 3600 + int(zone[3:5]) * 60
+        seconds -= offset if zone[0] == "+" else -offset
+
+    return seconds
+
+
+class BruteForceDetector:
+    """
+    Detects brute force logins: threshold failed logins from one IP
+    within window seconds.
+
+    For every IP only the times of its last threshold failures are
+    kept, and IPs without a failure in the last window seconds are
+    forgotten. Memory therefore grows with the number of currently
+    active attackers, not with every IP that ever mistyped a password.
+    """
+
+    def __init__(self, threshold=3, window=300):
+        self.threshold = threshold
+        self.window = window
+
+        # ip -> recent failure times, ordered by the latest failure,
+        # so idle IPs are always at the front
+        self.failures = OrderedDict()
+
+    def add(self, ip, when):
+        """
+        Records a failed login at time when (seconds).
+        Returns True when this failure reaches the threshold, which
+        happens once per burst: while the IP keeps failing fast enough
+        it stays above the threshold and is not reported again.
+        """
+        self.expire(when)
+
+        times = self.failures.get(ip)
+
+        if times is None:
+            times = self.failures[ip] = deque(maxlen=self.threshold)
+        else:
+            self.failures.move_to_end(ip)
+
+        while times and times[0] <= when - self.window:
+            times.popleft()
+
+        before = len(times)
+        times.append(when)
+
+        return before == self.threshold - 1
+
+    def expire(self, now):
+        """
+        Forgets IPs whose last failure is older than the window.
+        """
+        while self.failures:
+            ip, times = next(iter(self.failures.items()))
+
+            if times[-1] > now - self.window:
+                break
+
+            del self.failures[ip]
+
+    def __len__(self):
+        return len(self.failures)
+
+    def to_state(self):
+        return [[ip, list(times)] for ip, times in self.failures.items()]
+
+    def restore(self, state):
+        self.failures = OrderedDict(
+            (ip, deque(times, maxlen=self.threshold)) for ip, times in state
+        )
@@ -1,10 +1,34 @@
+import os
 import re
+import bz2
+import glob
+import gzip
+import lzma
+import json
+import time
+import heapq
+import argparse
 import logging
-from collections import defaultdict, Counter
+import tempfile
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from spill_store import SpillList
+from sketches import HyperLogLog, SpaceSaving
+from security_rules import SecurityRules
+from brute_force import BruteForceDetector, parse_timestamp
+from log_columns import ColumnWriter, clear_columns
+import audit_logging
+from audit_logging import MALFORMED, INCIDENT
+
+# Security rules used when no other rules file is given
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "security_rules.json")
 
 # Configure logging so that messages are written
 # both to file analysis_audit.log and the console.
 # This helps track security warnings and system errors.
+# main() can switch to rate limited or asynchronous logging,
+# see audit_logging.py.
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s",
@@ -15,6 +39,94 @@ logging.basicConfig(
 )
 
 
+class LogEntry(namedtuple("LogEntry", "ip timestamp method url status size")):
+    """
+    Compact record for one parsed log line.
+    A tuple with named fields (entry.url, entry.status, ...) takes much
+    less memory than a dictionary, which matters for the stored errors.
+    """
+
+    __slots__ = ()
+
+
+# Builds a LogEntry directly from a tuple of values. This skips the
+# Python level __new__ of namedtuple, which is noticeable per line.
+new_entry = tuple.__new__
+
+
+# Compressed log formats that can be read directly, by file extension
+OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+
+def resolve_log_files(filename):
+    """
+    Turns the filename given to LogAnalyzer into a list of files.
+    It can be a single path, a glob pattern such as "server.log*",
+    or a list of paths and patterns. Files matched by a pattern are
+    read oldest first, because the brute force detector and the error
+    report expect time to move forward (see rotation_sort_key):
+    server.log.3.gz, server.log.2.gz, server.log.1, server.log
+    """
+    names = [filename] if isinstance(filename, str) else list(filename)
+    files = []
+
+    for name in names:
+        if glob.has_magic(name):
+            files.extend(sorted(glob.glob(name), key=rotation_sort_key))
+        else:
+            files.append(name)
+
+    return files
+
+
+def natural_sort_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def rotation_sort_key(name):
+    """
+    Sort key that puts rotated logs of the same file oldest first and
+    the live file last. logrotate numbers rotations upwards with age
+    (server.log.1 is newer than server.log.2.gz), so numbers sort in
+    reverse. Date suffixes (server.log-20260220.gz) sort in order.
+    Other names are compared with natural_sort_key.
+    """
+    stem = name[:-len(os.path.splitext(name)[1])] if is_compressed(name) else name
+
+    numbered = re.fullmatch(r"(.+)\.(\d+)", stem)
+    if numbered:
+        return natural_sort_key(numbered.group(1)), 0, -int(numbered.group(2))
+
+    dated = re.fullmatch(r"(.+)-(\d{8})", stem)
+    if dated:
+        return natural_sort_key(dated.group(1)), 0, int(dated.group(2))
+
+    return natural_sort_key(stem), 1, 0
+
+
+def is_compressed(path):
+    return os.path.splitext(path)[1] in OPENERS
+
+
+def open_log(path):
+    """
+    Opens a plain or compressed (gzip, bz2, xz) log file for reading text.
+    """
+    opener = OPENERS.get(os.path.splitext(path)[1])
+
+    if opener:
+        return opener(path, "rt")
+
+    return open(path, "r")
+
+
+def entry_from_values(values):
+    """
+    Turns the list stored in a spill file back into a LogEntry.
+    """
+    return new_entry(LogEntry, values)
+
+
 class LogAnalyzer:
     """
     This class reads an Apache-style server log file,
@@ -22,9 +134,33 @@ class LogAnalyzer:
     and generates multiple reports based on the analysis.
     """
 
-    def __init__(self, filename):
-        # Store the name of the log file to analyze
+    def __init__(self, filename, spill_dir=None, buffer_size=10000,
+                 sketch=False, ip_error=0.01, url_error=0.001, rules_file=None,
+                 columns_dir=None):
+        # Store the name of the log file to analyze. This can also be a
+        # glob pattern or a list of files, which may be compressed.
         self.filename = filename
+        self.filenames = resolve_log_files(filename)
+
+        # When spill_dir is set, errors and incidents are kept on disk
+        # with at most buffer_size of each in memory
+        self.spill_dir = spill_dir
+        self.buffer_size = buffer_size
+
+        # When sketch is set, unique IPs and top URLs are estimated with
+        # fixed size sketches instead of exact sets and counters
+        self.sketch = sketch
+        self.ip_error = ip_error
+        self.url_error = url_error
+
+        # When columns_dir is set, every parsed entry is also written to a
+        # columnar export there (see log_columns.py and log_queries.py)
+        self.columns_dir = columns_dir
+        self.columns = None
+
+        # Brute force, status code and URL signature rules
+        self.rules_file = rules_file or DEFAULT_RULES_FILE
+        self.rules = SecurityRules.load(self.rules_file)
 
         # Regular expression pattern used to extract:
         # IP address, timestamp, HTTP method, URL,
@@ -35,121 +171,558 @@ class LogAnalyzer:
 
         # variables used to store traffic statistics
         self.total_requests = 0
-        self.unique_ips = set()
+        self.unique_ips = HyperLogLog(ip_error) if sketch else set()
         self.method_counts = Counter()
-        self.url_counts = Counter()
+        self.url_counts = SpaceSaving(url_error) if sketch else Counter()
         self.status_counts = Counter()
-        self.errors = []
+        self.errors = self.new_store("errors", entry_from_values)
 
         # variables used to track potential security issues :)))
-        self.failed_logins = defaultdict(int)
-        self.security_incidents = []
+        self.failed_logins = BruteForceDetector(
+            self.rules.brute_force["threshold"],
+            self.rules.brute_force.get("window_seconds", 300)
+        )
+        self.security_incidents = self.new_store("incidents")
+
+        # position reached in the log file, used by follow mode
+        self.offset = 0
+        self.lines_read = 0
+
+    def new_store(self, name, decode=None):
+        """
+        Returns a plain list, or a SpillList file in spill_dir
+        when bounded memory use was requested.
+        """
+        if not self.spill_dir:
+            return []
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        return SpillList(os.path.join(self.spill_dir, name + ".jsonl"), self.buffer_size, decode)
+
+    def worker_settings(self):
+        """
+        Options that worker processes need to analyze a chunk
+        the same way this analyzer would.
+        """
+        return {
+            "spill_dir": self.spill_dir,
+            "buffer_size": self.buffer_size,
+            "sketch": self.sketch,
+            "ip_error": self.ip_error,
+            "url_error": self.url_error,
+            "rules_file": self.rules_file,
+            "columns_dir": self.columns_dir
+        }
+
+    def close(self):
+        """
+        Deletes the spill files once the reports are written.
+        """
+        for store in (self.errors, self.security_incidents):
+            if isinstance(store, SpillList):
+                store.clear()
 
     def parse_line(self, line):
+        """
+        Same as parse_entry but returns a dictionary instead of a LogEntry,
+        or None for a malformed line.
+        """
+        entry = self.parse_entry(line)
+
+        return entry._asdict() if entry else None
+
+    def parse_entry(self, line):
         """
         Attempts to match a log line against the regex pattern.
-        If successful, returns a dictionary of extracted values.
+        If successful, returns a LogEntry with the extracted values.
         If not, logs a warning and skips the line.
         """
         match = self.log_pattern.match(line)
 
         if not match:
-            logging.warning("Skipping malformed log entry.")
+            logging.warning("Skipping malformed log entry.", extra=MALFORMED)
             return None
 
         ip, timestamp, method, url, status, size = match.groups()
 
-        return {
-            "ip": ip,
-            "timestamp": timestamp,
-            "method": method,
-            "url": url,
-            "status": int(status),
-            "size": int(size)
-        }
+        return new_entry(LogEntry, (ip, timestamp, method, url, int(status), int(size)))
 
     def check_security(self, entry):
         """
-        Checks each log entry for common security threats:
+        Checks each log entry for common security threats
+        using the rules from the rules file:
         - Brute force login attempts
-        - Forbidden resource access
-        - Basic SQL injection keywords
+        - Status codes such as forbidden resource access
+        - URL signatures (SQL injection, XSS, path traversal, ...)
         """
+        rules = self.rules
 
-        # Detect brute force attempts (3 failed login attempts from the same IP)
-        if entry["url"] == "/login" and entry["status"] == 401:
-            self.failed_logins[entry["ip"]] += 1
-
-            if self.failed_logins[entry["ip"]] == 3:
-                message = f"Brute force attempt suspected from {entry['ip']}"
-                self.security_incidents.append(message)
-                logging.warning(message)
+        # Detect brute force attempts (repeated failed logins from the same IP)
+        if entry.status == rules.brute_force["status"] and entry.url == rules.brute_force["url"]:
+            self.record_failed_login(entry.ip, entry.timestamp)
 
         # Detect attempts to access forbidden ports or entries
-        if entry["status"] == 403:
-            message = f"Forbidden access attempt: {entry['ip']} -> {entry['url']}"
-            self.security_incidents.append(message)
-            logging.warning(message)
+        message = rules.status_rules.get(entry.status)
 
-        # Detect simple SQL injection patterns in URLs
-        suspicious_words = ["select", "union", "drop", "--", ";"]
-        url_lower = entry["url"].lower()
+        if message:
+            self.report_incident(message.format(ip=entry.ip, url=entry.url))
 
-        for word in suspicious_words:
-            if word in url_lower:
-                message = f"Possible SQL injection attempt from {entry['ip']}"
-                self.security_incidents.append(message)
-                logging.warning(message)
-                break
+        # Detect attack patterns in URLs, one scan for all signatures
+        message = rules.match_url(entry.url)
+
+        if message:
+            self.report_incident(message.format(ip=entry.ip, url=entry.url))
+
+    def record_failed_login(self, ip, timestamp):
+        """
+        Records a failed login and raises an incident when the IP
+        reaches the brute force threshold within the time window.
+        """
+        try:
+            when = parse_timestamp(timestamp)
+
+        except ValueError as e:
+            logging.error(f"Cannot check failed login from {ip} - {e}")
+            return
+
+        if self.failed_logins.add(ip, when):
+            self.report_incident(self.rules.brute_force["message"].format(ip=ip))
+
+    def report_incident(self, message):
+        """
+        Stores a security incident and writes it to the audit log.
+        """
+        self.security_incidents.append(message)
+        logging.warning(message, extra=INCIDENT)
+
+    def process_entry(self, entry):
+        """
+        Updates the traffic statistics for one parsed log entry
+        and runs the security checks on it.
+        """
+        # Update traffic statistics
+        self.total_requests += 1
+        self.unique_ips.add(entry.ip)
+        self.method_counts[entry.method] += 1
+        if self.sketch:
+            self.url_counts.add(entry.url)
+        else:
+            self.url_counts[entry.url] += 1
+        self.status_counts[entry.status] += 1
+
+        # Track HTTP errors,, status codes 400 and above..
+        if entry.status >= 400:
+            self.errors.append(entry)
+
+        # Perform security checks on each valid entry
+        self.check_security(entry)
+
+        if self.columns is not None:
+            self.columns.add(entry)
+
+    def process_line(self, line, line_number):
+        """
+        Parses a single raw line and feeds it into the statistics.
+        Conversion problems and unexpected errors are logged so
+        that one bad line never stops the whole analysis.
+        """
+        try:
+            entry = self.parse_entry(line.strip())
+
+            if not entry:
+                return
+
+            self.process_entry(entry)
+
+        except ValueError as e:
+            # Handles issues converting status or size to integers
+            logging.error(f"Line {line_number}: Data conversion error - {e}")
+
+        except Exception as e:
+            # Catches unexpected errors without stopping the program
+            logging.error(f"Line {line_number}: Unexpected error - {e}")
 
     def analyze_logs(self):
         """
-        Opens the log file safely using 'with open'.
+        Opens each log file safely using 'with open'.
         Reads it line-by-line to handle large files efficiently.
         Updates statistics and performs security checks for each entry.
+        Compressed files are decompressed while reading.
         """
-        try:
-            with open(self.filename, "r") as file:
-                for line_number, line in enumerate(file, 1):
+        if self.columns_dir:
+            clear_columns(self.columns_dir)
 
-                    try:
-                        entry = self.parse_line(line.strip())
+        for index, path in enumerate(self.filenames):
+            try:
+                with open_log(path) as file:
+                    if self.columns_dir:
+                        self.columns = ColumnWriter(segment_folder(self.columns_dir, index, 0))
 
-                        if not entry:
-                            continue
+                    for line_number, line in enumerate(file, 1):
+                        self.process_line(line, line_number)
 
-                        # Update traffic statistics
-                        self.total_requests += 1
-                        self.unique_ips.add(entry["ip"])
-                        self.method_counts[entry["method"]] += 1
-                        self.url_counts[entry["url"]] += 1
-                        self.status_counts[entry["status"]] += 1
+                self.close_columns()
 
-                        # Track HTTP errors,, status codes 400 and above..
-                        if entry["status"] >= 400:
-                            self.errors.append(entry)
+            except FileNotFoundError:
+                logging.critical(f"Log file not found: {path}")
+                print(f"Error: {path} does not exist.")
 
-                        # Perform security checks on each valid entry
-                        self.check_security(entry)
+            except PermissionError:
+                logging.critical(f"Permission denied reading log file: {path}")
+                print(f"Error: Cannot access {path}.")
 
-                    except ValueError as e:
-                        # Handles issues converting status or size to integers
-                        logging.error(f"Line {line_number}: Data conversion error - {e}")
+        logging.info("Log analysis completed successfully.")
 
-                    except Exception as e:
-                        # Catches unexpected errors without stopping the program
-                        logging.error(f"Line {line_number}: Unexpected error - {e}")
+    def analyze_logs_parallel(self, workers=None, chunks=None):
+        """
+        Parallel version of analyze_logs for very large files.
+        Plain files are split into byte ranges that always start and end
+        on a line boundary, compressed files are one task each (they can
+        only be read from the start). Every task is parsed in its own
+        process, and the partial results are merged back in file order
+        so the statistics and reports match a serial run exactly.
+        """
+        workers = workers or os.cpu_count() or 1
+
+        try:
+            tasks = plan_tasks(self.filenames, chunks or workers * 4)
+
+            # Workers write one export segment per task
+            if self.columns_dir:
+                clear_columns(self.columns_dir)
+
+            # Workers cannot use the queue thread of this process,
+            # they get the same rate limit with direct writes
+            if audit_logging.current:
+                pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=audit_logging.configure_worker_logging,
+                    initargs=(audit_logging.current.worker_settings(),)
+                )
+            else:
+                pool = ProcessPoolExecutor(max_workers=workers)
+
+            with pool:
+                partials = pool.map(
+                    analyze_chunk,
+                    [path for index, path, start, end in tasks],
+                    [start for index, path, start, end in tasks],
+                    [end for index, path, start, end in tasks],
+                    [self.worker_settings()] * len(tasks),
+                    [index for index, path, start, end in tasks]
+                )
+
+                # map() yields results in submission order, which is
+                # the same order the chunks appear in the files
+                for partial in partials:
+                    self.merge_partial(partial)
 
             logging.info("Log analysis completed successfully.")
 
-        except FileNotFoundError:
-            logging.critical("Log file not found.")
-            print("Error: server.log does not exist.")
+        except FileNotFoundError as e:
+            logging.critical(f"Log file not found: {e.filename}")
+            print(f"Error: {e.filename} does not exist.")
 
         except PermissionError:
             logging.critical("Permission denied reading log file.")
             print("Error: Cannot access log file.")
 
+    def close_columns(self):
+        """
+        Finishes the columnar export, if one is being written.
+        """
+        if self.columns is not None:
+            self.columns.close()
+            self.columns = None
+            logging.info(f"Columnar export written to {self.columns_dir}.")
+
+    def merge_partial(self, partial):
+        """
+        Adds the results of one chunk to this analyzer.
+        Chunks must be merged in file order.
+
+        Brute force detection depends on the failed logins an IP had
+        before the chunk started, so workers only report when and where
+        their failed logins happened and the detector runs here.
+        """
+        self.total_requests += partial["total_requests"]
+        # Works for sets and counters as well as for the sketches
+        self.unique_ips.update(partial["unique_ips"])
+        self.method_counts.update(partial["method_counts"])
+        self.url_counts.update(partial["url_counts"])
+        self.status_counts.update(partial["status_counts"])
+        self.errors.extend(partial["errors"])
+        audit_logging.add_worker_stats(partial["audit_aggregated"])
+
+        brute_force = []
+
+        for position, ip, when in partial["failed_logins"]:
+            # An alert sorts before any other incident of the same entry
+            # because check_security looks at logins first
+            if self.failed_logins.add(ip, when):
+                message = self.rules.brute_force["message"].format(ip=ip)
+                brute_force.append((position, -1, message))
+                logging.warning(message, extra=INCIDENT)
+
+        # Incidents are ordered by the entry that caused them and then
+        # by the order they were raised in. The chunk incidents are
+        # already sorted, so they can be streamed instead of loaded.
+        for position, order, message in heapq.merge(partial["incidents"], sorted(brute_force)):
+            self.security_incidents.append(message)
+
+        # Spill files of the chunk are not needed anymore
+        for store in (partial["errors"], partial["incidents"], partial["failed_logins"]):
+            if isinstance(store, SpillList):
+                store.clear()
+
+    def follow(self, checkpoint_file="analyzer_checkpoint.json",
+               poll_interval=1.0, report_interval=60.0):
+        """
+        Keeps reading the log file as it grows, like 'tail -F'.
+
+        Statistics stay in memory between reads. Every report_interval
+        seconds (also while a backlog is still being read) the reports
+        are rewritten and a checkpoint with the byte
+        offset and the current statistics is saved, so a restart resumes
+        where the last run stopped instead of re-parsing the whole file.
+        The file is reopened from the start when it is rotated
+        (renamed and recreated) or truncated. Stops on Ctrl+C.
+
+        Only a single plain text file can be followed. The columnar
+        export is not available here, it is meant for analyzing
+        finished log files.
+        """
+        if len(self.filenames) != 1 or is_compressed(self.filenames[0]):
+            raise ValueError("Follow mode needs exactly one uncompressed log file.")
+
+        if self.columns_dir:
+            raise ValueError("The columnar export cannot be used in follow mode.")
+
+        inode = self.load_checkpoint(checkpoint_file)
+        file = None
+        pending = b""
+        next_flush = time.monotonic() + report_interval
+
+        try:
+            while True:
+                if file is None:
+                    file = self.open_for_follow(inode)
+                    inode = None
+
+                    if file is None:
+                        # The file does not exist yet (or is being rotated)
+                        time.sleep(poll_interval)
+                        continue
+
+                line = file.readline()
+
+                if line:
+                    pending += line
+
+                    # Only complete lines are processed, a partly written
+                    # line waits until the rest of it arrives
+                    if pending.endswith(b"\n"):
+                        self.consume(pending)
+                        pending = b""
+
+                        # On a long backlog or a busy log readline() may not
+                        # come up empty for hours, so reports and checkpoints
+                        # are also written while lines are being read
+                        if time.monotonic() >= next_flush:
+                            self.flush_reports(checkpoint_file, file)
+                            next_flush = time.monotonic() + report_interval
+                    continue
+
+                if self.file_replaced(file):
+                    # The old file will not grow anymore, so whatever is
+                    # left in it is the last line
+                    if pending:
+                        self.consume(pending)
+                        pending = b""
+
+                    logging.info("Log file rotated, reopening.")
+                    file.close()
+                    file = None
+                    self.offset = 0
+                    continue
+
+                if os.fstat(file.fileno()).st_size < self.offset:
+                    logging.info("Log file truncated, reading from the start.")
+                    file.seek(0)
+                    pending = b""
+                    self.offset = 0
+                    continue
+
+                if time.monotonic() >= next_flush:
+                    self.flush_reports(checkpoint_file, file)
+                    next_flush = time.monotonic() + report_interval
+
+                time.sleep(poll_interval)
+
+        except KeyboardInterrupt:
+            logging.info("Follow mode stopped.")
+
+        finally:
+            if file is not None:
+                self.flush_reports(checkpoint_file, file)
+                file.close()
+
+    def consume(self, raw_line):
+        """
+        Processes one complete line read in follow mode
+        and advances the byte offset past it.
+        """
+        self.offset += len(raw_line)
+        self.lines_read += 1
+        self.process_line(raw_line.decode("utf-8", errors="replace"), self.lines_read)
+
+    def open_for_follow(self, inode=None):
+        """
+        Opens the log file in binary mode at the current offset.
+        If the checkpoint belongs to a different file (the log was
+        rotated while we were not running) or the file is now shorter
+        than the offset, reading starts from the beginning.
+        """
+        try:
+            file = open(self.filenames[0], "rb")
+        except FileNotFoundError:
+            return None
+
+        stat = os.fstat(file.fileno())
+
+        if (inode is not None and stat.st_ino != inode) or stat.st_size < self.offset:
+            logging.info("Checkpoint does not match the log file, starting from the beginning.")
+            self.offset = 0
+
+        file.seek(self.offset)
+        return file
+
+    def file_replaced(self, file):
+        """
+        Returns True when the path now points to a different file
+        than the one we have open (log rotation).
+        """
+        try:
+            return os.stat(self.filenames[0]).st_ino != os.fstat(file.fileno()).st_ino
+        except FileNotFoundError:
+            # Renamed away and not recreated yet, keep reading the old one
+            return False
+
+    def flush_reports(self, checkpoint_file, file):
+        """
+        Rewrites all reports and saves the checkpoint.
+        """
+        self.generate_summary()
+        self.generate_security_report()
+        self.generate_error_report()
+
+        if checkpoint_file:
+            self.save_checkpoint(checkpoint_file, os.fstat(file.fileno()).st_ino)
+
+    def save_checkpoint(self, checkpoint_file, inode):
+        """
+        Saves the byte offset and the statistics collected so far.
+        The file is written to a temporary name first and then renamed,
+        so a crash while saving never leaves a broken checkpoint.
+        """
+        checkpoint = {
+            "filename": self.filename,
+            "inode": inode,
+            "offset": self.offset,
+            "lines_read": self.lines_read,
+            "total_requests": self.total_requests,
+            "unique_ips": self.unique_ips.to_state() if self.sketch else list(self.unique_ips),
+            "method_counts": self.method_counts,
+            "url_counts": self.url_counts.to_state() if self.sketch else self.url_counts,
+            "status_counts": self.status_counts,
+            "errors": self.checkpoint_store(self.errors),
+            "failed_logins": self.failed_logins.to_state(),
+            "security_incidents": self.checkpoint_store(self.security_incidents)
+        }
+
+        temp_file = checkpoint_file + ".tmp"
+
+        with open(temp_file, "w") as file:
+            json.dump(checkpoint, file)
+
+        os.replace(temp_file, checkpoint_file)
+
+    def load_checkpoint(self, checkpoint_file):
+        """
+        Restores the offset and statistics from a checkpoint file.
+        Returns the inode the checkpoint was taken from, or None
+        when there is no usable checkpoint.
+        """
+        if not checkpoint_file:
+            return None
+
+        try:
+            with open(checkpoint_file, "r") as file:
+                checkpoint = json.load(file)
+
+        except FileNotFoundError:
+            return None
+
+        except (ValueError, OSError) as e:
+            logging.error(f"Ignoring unreadable checkpoint - {e}")
+            return None
+
+        if checkpoint.get("filename") != self.filename:
+            logging.warning("Checkpoint belongs to a different log file, ignoring it.")
+            return None
+
+        if self.sketch != isinstance(checkpoint["unique_ips"], dict):
+            raise ValueError("Checkpoint was taken with a different --sketch setting.")
+
+        self.offset = checkpoint["offset"]
+        self.lines_read = checkpoint["lines_read"]
+        self.total_requests = checkpoint["total_requests"]
+        if self.sketch:
+            self.unique_ips = HyperLogLog.from_state(checkpoint["unique_ips"])
+            self.url_counts = SpaceSaving.from_state(checkpoint["url_counts"])
+        else:
+            self.unique_ips = set(checkpoint["unique_ips"])
+            self.url_counts = Counter(checkpoint["url_counts"])
+
+        self.method_counts = Counter(checkpoint["method_counts"])
+
+        # JSON object keys are always strings, status codes are ints
+        self.status_counts = Counter({
+            int(status): count for status, count in checkpoint["status_counts"].items()
+        })
+
+        self.restore_store(self.errors, checkpoint["errors"], entry_from_values)
+        self.failed_logins.restore(checkpoint["failed_logins"])
+        self.restore_store(self.security_incidents, checkpoint["security_incidents"])
+
+        logging.info(f"Resuming from checkpoint at byte {self.offset}.")
+        return checkpoint["inode"]
+
+    def checkpoint_store(self, store):
+        """
+        Spill files are already on disk, so only their position is saved.
+        Plain lists are saved in full.
+        """
+        if isinstance(store, SpillList):
+            return store.checkpoint()
+
+        return list(store)
+
+    def restore_store(self, store, saved, decode=None):
+        """
+        Refills errors or incidents from a checkpoint.
+        """
+        if isinstance(saved, dict):
+            if not isinstance(store, SpillList):
+                raise ValueError("Checkpoint was taken with --spill-dir, use the same option to resume.")
+            store.restore(saved)
+            return
+
+        if isinstance(store, SpillList):
+            store.clear()
+
+        store.extend(decode(item) if decode else item for item in saved)
+
     def generate_summary(self):
         """
         Creates a summary report containing:
@@ -158,6 +731,8 @@ class LogAnalyzer:
         - HTTP method distribution
         - Top 5 URLs
         - Status code distribution
+        In sketch mode the IP count and URL counts are estimates
+        and the report states the error bound that was used.
         """
         with open("summary_report.txt", "w") as report:
 
@@ -165,13 +740,27 @@ class LogAnalyzer:
             report.write("=" * 50 + "\n\n")
 
             report.write(f"Total Requests: {self.total_requests}\n")
-            report.write(f"Unique IP Addresses: {len(self.unique_ips)}\n\n")
+
+            if self.sketch:
+                report.write(
+                    f"Unique IP Addresses: ~{len(self.unique_ips)} "
+                    f"(HyperLogLog estimate, standard error {self.unique_ips.error:.2%})\n\n"
+                )
+            else:
+                report.write(f"Unique IP Addresses: {len(self.unique_ips)}\n\n")
 
             report.write("HTTP Methods:\n")
             for method, count in self.method_counts.items():
                 report.write(f"{method}: {count}\n")
 
-            report.write("\nTop 5 URLs:\n")
+            if self.sketch:
+                report.write(
+                    f"\nTop 5 URLs (Space-Saving estimate, counts may be up to "
+                    f"{self.url_counts.max_overestimate()} too high, "
+                    f"error bound {self.url_counts.error:.2%} of requests):\n"
+                )
+            else:
+                report.write("\nTop 5 URLs:\n")
             for url, count in self.url_counts.most_common(5):
                 report.write(f"{url}: {count}\n")
 
@@ -185,6 +774,8 @@ class LogAnalyzer:
         """
         Writes all detected security incidents to a separate file.
         This helps administrators review suspicious behaviour.
+        Incidents are streamed, so this also works when they are
+        stored on disk.
         """
         with open("security_report.txt", "w") as report:
 
@@ -202,6 +793,8 @@ class LogAnalyzer:
         """
         Writes all HTTP errors (status >= 400) to a report file
         including timestamp, IP address, method, URL, and status code.
+        Errors are streamed, so this also works when they are
+        stored on disk.
         """
         with open("error_log.txt", "w") as report:
 
@@ -212,32 +805,324 @@ class LogAnalyzer:
 
             for error in self.errors:
                 report.write(
-                    f"[{error['timestamp']}] "
-                    f"{error['ip']} - "
-                    f"{error['method']} {error['url']} - "
-                    f"Status {error['status']}\n"
+                    f"[{error.timestamp}] "
+                    f"{error.ip} - "
+                    f"{error.method} {error.url} - "
+                    f"Status {error.status}\n"
                 )
 
         logging.info("Error report generated.")
 
 
+class ChunkAnalyzer(LogAnalyzer):
+    """
+    LogAnalyzer used inside worker processes for one byte range.
+    It records the position of every incident and the position and
+    time of every failed login so the parent can merge chunks in the
+    right order.
+    """
+
+    def __init__(self, filename, **settings):
+        super().__init__(filename, **settings)
+        self.position = 0
+
+        # Every worker needs its own spill files
+        self.errors = self.new_chunk_store("errors", entry_from_values)
+        self.incidents = self.new_chunk_store("incidents", tuple)
+        self.logins = self.new_chunk_store("logins", tuple)
+
+    def new_chunk_store(self, name, decode):
+        if not self.spill_dir:
+            return []
+
+        handle, path = tempfile.mkstemp(prefix=f"chunk-{name}-", suffix=".jsonl", dir=self.spill_dir)
+        os.close(handle)
+        return SpillList(path, self.buffer_size, decode)
+
+    def process_entry(self, entry):
+        self.position += 1
+        super().process_entry(entry)
+
+    def record_failed_login(self, ip, timestamp):
+        # The detector runs in merge_partial(), which sees all chunks
+        try:
+            when = parse_timestamp(timestamp)
+
+        except ValueError as e:
+            logging.error(f"Cannot check failed login from {ip} - {e}")
+            return
+
+        self.logins.append((self.position, ip, when))
+
+    def report_incident(self, message):
+        self.incidents.append((self.position, len(self.incidents), message))
+        logging.warning(message, extra=INCIDENT)
+
+    def analyze_range(self, start, end, file_index=0):
+        """
+        Parses every line that starts inside the byte range [start, end).
+        When end is None the whole file is read, which is how
+        compressed files are handled.
+        """
+        if self.columns_dir:
+            self.columns = ColumnWriter(segment_folder(self.columns_dir, file_index, start))
+
+        if end is None:
+            with open_log(self.filename) as file:
+                for line_number, line in enumerate(file, 1):
+                    self.process_line(line, f"{line_number} of {self.filename}")
+
+            self.close_columns()
+            return
+
+        with open(self.filename, "rb") as file:
+            file.seek(start)
+            offset = start
+
+            for line_number, raw_line in enumerate(file, 1):
+                if offset >= end:
+                    break
+
+                offset += len(raw_line)
+                line = raw_line.decode("utf-8", errors="replace")
+                self.process_line(line, f"{line_number} of chunk at byte {start}")
+
+        self.close_columns()
+
+    def partial_results(self):
+        """
+        Returns the chunk statistics as plain picklable values.
+        """
+        return {
+            "total_requests": self.total_requests,
+            "unique_ips": self.unique_ips,
+            "method_counts": self.method_counts,
+            "url_counts": self.url_counts,
+            "status_counts": self.status_counts,
+            "errors": self.errors,
+            "incidents": self.incidents,
+            "failed_logins": self.logins
+        }
+
+
+def segment_folder(columns_dir, file_index, start):
+    """
+    Folder for one segment of the columnar export.
+    Zero padded so segments sort in file order.
+    """
+    return os.path.join(columns_dir, f"segment-{file_index:05d}-{start:015d}")
+
+
+def plan_tasks(filenames, chunks):
+    """
+    Splits the work for analyze_logs_parallel into tasks of
+    (file index, path, start byte, end byte), in file order.
+    Plain files are cut into pieces of about the same size,
+    compressed files are a single task with end None.
+    Missing or unreadable files are logged and skipped like in
+    analyze_logs, so they do not stop the other files.
+    """
+    sizes = {}
+
+    for index, path in enumerate(filenames):
+        try:
+            with open(path, "rb"):
+                sizes[index] = os.path.getsize(path)
+
+        except FileNotFoundError:
+            logging.critical(f"Log file not found: {path}")
+            print(f"Error: {path} does not exist.")
+
+        except PermissionError:
+            logging.critical(f"Permission denied reading log file: {path}")
+            print(f"Error: Cannot access {path}.")
+
+    plain_size = sum(size for index, size in sizes.items() if not is_compressed(filenames[index]))
+    chunk_size = max(plain_size // max(chunks, 1), 1)
+
+    tasks = []
+
+    for index, path in enumerate(filenames):
+        if index not in sizes:
+            continue
+
+        if is_compressed(path):
+            tasks.append((index, path, 0, None))
+            continue
+
+        pieces = -(-sizes[index] // chunk_size)
+
+        for start, end in split_into_chunks(path, pieces):
+            tasks.append((index, path, start, end))
+
+    return tasks
+
+
+def split_into_chunks(filename, chunks):
+    """
+    Splits a file into roughly equal byte ranges.
+    Every boundary is moved forward to the start of the next line
+    so no line is ever cut in half between two workers.
+    """
+    size = os.path.getsize(filename)
+    chunk_size = max(size // max(chunks, 1), 1)
+
+    boundaries = [0]
+
+    with open(filename, "rb") as file:
+        position = chunk_size
+
+        while position < size:
+            file.seek(position)
+            file.readline()
+            position = file.tell()
+
+            if position >= size:
+                break
+
+            boundaries.append(position)
+            position += chunk_size
+
+    boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def analyze_chunk(filename, start, end, settings, file_index=0):
+    """
+    Worker entry point: analyzes one byte range of a log file
+    (or a whole compressed file) and returns the partial results
+    for merging.
+    """
+    analyzer = ChunkAnalyzer(filename, **settings)
+    analyzer.analyze_range(start, end, file_index)
+
+    partial = analyzer.partial_results()
+    partial["audit_aggregated"] = audit_logging.collect_worker_stats()
+    return partial
+
+
 def main():
     """
     Main function that creates the analyzer object,
     runs the analysis, and generates all reports.
     """
-    analyzer = LogAnalyzer("server.log")
+    parser = argparse.ArgumentParser(description="Analyze an Apache-style server log.")
+    parser.add_argument(
+        "filenames", nargs="*", default=["server.log"],
+        help="log files or glob patterns, .gz/.bz2/.xz files are decompressed"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="number of worker processes (0 = serial analysis)"
+    )
+    parser.add_argument(
+        "--spill-dir",
+        help="keep errors and incidents in files in this folder instead of in memory"
+    )
+    parser.add_argument(
+        "--buffer-size", type=int, default=10000,
+        help="errors/incidents kept in memory before writing them to --spill-dir"
+    )
+    parser.add_argument(
+        "--sketch", action="store_true",
+        help="estimate unique IPs and top URLs with fixed size sketches"
+    )
+    parser.add_argument(
+        "--ip-error", type=float, default=0.01,
+        help="relative standard error of the unique IP estimate in --sketch mode"
+    )
+    parser.add_argument(
+        "--url-error", type=float, default=0.001,
+        help="largest URL count overestimate, as a share of requests, in --sketch mode"
+    )
+    parser.add_argument(
+        "--rules", default=DEFAULT_RULES_FILE,
+        help="JSON file with the security rules"
+    )
+    parser.add_argument(
+        "--columns",
+        help="also write the parsed entries to a columnar export in this folder"
+    )
+    parser.add_argument(
+        "--follow", action="store_true",
+        help="keep reading the log as it grows (stop with Ctrl+C)"
+    )
+    parser.add_argument(
+        "--checkpoint", default="analyzer_checkpoint.json",
+        help="checkpoint file used by --follow to resume after a restart"
+    )
+    parser.add_argument(
+        "--report-interval", type=float, default=60.0,
+        help="seconds between report rewrites in --follow mode"
+    )
+    parser.add_argument(
+        "--async-logging", action="store_true",
+        help="write the audit log from a background thread instead of the parse loop"
+    )
+    parser.add_argument(
+        "--log-interval", type=float,
+        help="summarize repeated malformed line and incident messages every this many seconds "
+             "(default 10 with --async-logging, otherwise off)"
+    )
+    parser.add_argument(
+        "--log-burst", type=int, default=5,
+        help="messages of each kind written per --log-interval before summarizing the rest"
+    )
+    parser.add_argument(
+        "--log-queue-size", type=int, default=10000,
+        help="messages waiting for the --async-logging thread before new ones are dropped"
+    )
+    args = parser.parse_args()
+
+    audit = None
+    log_interval = args.log_interval
 
-    analyzer.analyze_logs()
-    analyzer.generate_summary()
-    analyzer.generate_security_report()
-    analyzer.generate_error_report()
+    if log_interval is None and args.async_logging:
+        log_interval = 10.0
+
+    if args.async_logging or log_interval:
+        audit = audit_logging.configure_logging(
+            asynchronous=args.async_logging, interval=log_interval,
+            burst=args.log_burst, queue_size=args.log_queue_size
+        )
+
+    # A single name is kept as it is, so follow mode and checkpoints
+    # see the same filename as before
+    filename = args.filenames[0] if len(args.filenames) == 1 else args.filenames
+
+    analyzer = LogAnalyzer(
+        filename,
+        spill_dir=args.spill_dir, buffer_size=args.buffer_size,
+        sketch=args.sketch, ip_error=args.ip_error, url_error=args.url_error,
+        rules_file=args.rules, columns_dir=args.columns
+    )
+
+    if args.follow:
+        # follow() writes the reports itself, also when it stops
+        analyzer.follow(args.checkpoint, report_interval=args.report_interval)
+    else:
+        if args.workers:
+            analyzer.analyze_logs_parallel(workers=args.workers)
+        else:
+            analyzer.analyze_logs()
+
+        analyzer.generate_summary()
+        analyzer.generate_security_report()
+        analyzer.generate_error_report()
 
     print("\nAnalysis Complete!")
     print(f"Total Requests: {analyzer.total_requests}")
     print(f"Security Incidents: {len(analyzer.security_incidents)}")
     print(f"Errors Found: {len(analyzer.errors)}")
 
+    # In follow mode the spill files belong to the checkpoint
+    if not args.follow:
+        analyzer.close()
+
+    if audit:
+        audit.close()
+
 
 if __name__ == "__main__":
     main()
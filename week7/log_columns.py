@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import shutil
+from array import array
+
+from brute_force import parse_timestamp
+
+
+# Column name -> array type code.
+# ip, url and method are stored as ids into a string table.
+COLUMN_TYPES = {
+    "ip": "I",
+    "url": "I",
+    "method": "H",
+    "status": "H",
+    "size": "I",
+    "time": "q"
+}
+
+# Largest value for each type code, bigger values are capped
+TYPE_LIMITS = {"I": 2 ** 32 - 1, "H": 2 ** 16 - 1}
+
+STRING_COLUMNS = ("ip", "url", "method")
+
+
+def numpy_dtype(code):
+    """
+    NumPy dtype string (for example "<u4") matching an array type code
+    on this machine, so the files can be read back with numpy.fromfile.
+    """
+    order = "<" if sys.byteorder == "little" else ">"
+    kind = "i" if code == "q" else "u"
+    return f"{order}{kind}{array(code).itemsize}"
+
+
+def clear_columns(folder):
+    """
+    Removes the segments of an earlier export from the folder.
+    """
+    if not os.path.isdir(folder):
+        return
+
+    for name in os.listdir(folder):
+        if name.startswith("segment-"):
+            shutil.rmtree(os.path.join(folder, name))
+
+
+class ColumnWriter:
+    """
+    Writes parsed log entries to one segment of a columnar export.
+
+    Every column is a binary file of fixed size numbers (status as
+    uint16, size as uint32, time as epoch seconds in int64, ...).
+    IPs, URLs and methods are interned: the file holds a small id and
+    the text is stored once in the string table in meta.json.
+
+    Rows are buffered and appended to the files every flush_rows
+    entries, so memory use does not grow with the size of the log
+    (apart from the string tables). Segments are read back by
+    log_queries.load_columns.
+    """
+
+    def __init__(self, folder, flush_rows=65536):
+        self.folder = folder
+        self.flush_rows = flush_rows
+        self.rows = 0
+
+        self.strings = {name: {} for name in STRING_COLUMNS}
+        self.buffers = {name: array(code) for name, code in COLUMN_TYPES.items()}
+
+        os.makedirs(folder, exist_ok=True)
+
+        for name in COLUMN_TYPES:
+            open(self.column_path(name), "wb").close()
+
+    def column_path(self, name):
+        return os.path.join(self.folder, name + ".bin")
+
+    def add(self, entry):
+        buffers = self.buffers
+        ips, urls, methods = self.strings["ip"], self.strings["url"], self.strings["method"]
+
+        buffers["ip"].append(ips.setdefault(entry.ip, len(ips)))
+        buffers["url"].append(urls.setdefault(entry.url, len(urls)))
+        buffers["method"].append(methods.setdefault(entry.method, len(methods)))
+        buffers["status"].append(min(entry.status, TYPE_LIMITS["H"]))
+        buffers["size"].append(min(entry.size, TYPE_LIMITS["I"]))
+
+        try:
+            buffers["time"].append(parse_timestamp(entry.timestamp))
+        except ValueError:
+            # Unknown time, skipped by the per-minute query
+            buffers["time"].append(-1)
+
+        if len(buffers["ip"]) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        for name, buffer in self.buffers.items():
+            with open(self.column_path(name), "ab") as file:
+                buffer.tofile(file)
+
+        self.rows += len(self.buffers["ip"])
+        self.buffers = {name: array(code) for name, code in COLUMN_TYPES.items()}
+
+    def close(self):
+        """
+        Writes the remaining rows and the meta.json file.
+        """
+        self.flush()
+
+        meta = {
+            "rows": self.rows,
+            "dtypes": {name: numpy_dtype(code) for name, code in COLUMN_TYPES.items()},
+            # Dictionaries keep insertion order, so position == id
+            "strings": {name: list(table) for name, table in self.strings.items()}
+        }
+
+        with open(os.path.join(self.folder, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump(meta, file)
@@ -0,0 +1,102 @@
+import re
+import json
+
+
+class SecurityRules:
+    """
+    Security rules used by LogAnalyzer.check_security, loaded from a
+    JSON config file (see security_rules.json).
+
+    The config has three parts:
+    - brute_force: failed login rule (url, status, threshold, message)
+    - status_rules: a message for responses with a given status code
+    - url_signatures: suspicious text in URLs, either plain text or
+      a regular expression ("regex": true)
+
+    All URL signatures are compiled into one regular expression, so
+    every URL is scanned once no matter how many signatures there are.
+    Plain text signatures are merged into a prefix tree first, which
+    keeps the per-character cost low even with hundreds of them.
+    URLs are lowercased before matching, like the original check.
+
+    Messages can use {ip} and {url}.
+    """
+
+    def __init__(self, config):
+        self.brute_force = config["brute_force"]
+
+        self.status_rules = {
+            rule["status"]: rule["message"] for rule in config.get("status_rules", [])
+        }
+
+        self.literals = {}
+        alternatives = []
+        regex_messages = {}
+
+        for signature in config.get("url_signatures", []):
+            if signature.get("regex"):
+                name = f"rule{len(regex_messages)}"
+                alternatives.append(f"(?P<{name}>{signature['pattern']})")
+                regex_messages[name] = signature["message"]
+            else:
+                # The first signature for the same text wins
+                self.literals.setdefault(signature["pattern"].lower(), signature["message"])
+
+        if self.literals:
+            alternatives.insert(0, f"(?P<literal>{prefix_tree_pattern(self.literals)})")
+
+        self.regex_messages = regex_messages
+        self.url_pattern = re.compile("|".join(alternatives)) if alternatives else None
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def match_url(self, url):
+        """
+        Returns the message of the first signature found in the URL,
+        or None if the URL looks harmless.
+        """
+        if self.url_pattern is None:
+            return None
+
+        match = self.url_pattern.search(url.lower())
+
+        if not match:
+            return None
+
+        if match.lastgroup == "literal":
+            return self.literals[match.group()]
+
+        return self.regex_messages[match.lastgroup]
+
+
+def prefix_tree_pattern(words):
+    """
+    Builds a regular expression matching any of the words,
+    sharing common prefixes: ["select", "sleep"] -> s(?:elect|leep)
+    """
+    tree = {}
+
+    for word in words:
+        node = tree
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in node.items() if char]
+
+        if not branches:
+            return ""
+
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+
+        group = "(?:" + "|".join(branches) + ")"
+
+        # A word ends here but longer words continue, prefer the longer one
+        return group + "?" if "" in node else group
+
+    return build(tree)
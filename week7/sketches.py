@@ -0,0 +1,199 @@
+import math
+import heapq
+import hashlib
+
+
+def hash64(item):
+    """
+    Stable 64-bit hash of a string. Python's hash() changes between
+    processes, which would make sketches from workers impossible to merge.
+    """
+    return int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct items (for example unique IPs)
+    using a fixed amount of memory.
+
+    error is the wanted relative standard error, 0.01 means the count
+    is usually within 1% of the real value. The memory used is about
+    (1.04 / error) ** 2 bytes, so 0.01 needs roughly 16 KB.
+
+    Works like a set for counting: add(item), update(other) to merge
+    another sketch, and len() for the estimate.
+    """
+
+    def __init__(self, error=0.01):
+        wanted = math.ceil(math.log2((1.04 / error) ** 2))
+        self.precision = min(max(wanted, 4), 18)
+        self.size = 1 << self.precision
+        self.registers = bytearray(self.size)
+
+        # The error that this number of registers actually gives
+        self.error = 1.04 / math.sqrt(self.size)
+
+    def add(self, item):
+        value = hash64(item)
+
+        # The first bits choose the register, the rest decide the rank
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, other):
+        """
+        Merges another sketch into this one, like a set union.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different error bounds.")
+
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size ** 2 / sum(2.0 ** -rank for rank in self.registers)
+
+        # Small cardinalities are estimated better by counting empty registers
+        empty = self.registers.count(0)
+
+        if estimate <= 2.5 * self.size and empty:
+            estimate = self.size * math.log(self.size / empty)
+
+        return round(estimate)
+
+    def __len__(self):
+        return self.count()
+
+    def to_state(self):
+        return {"precision": self.precision, "registers": self.registers.hex()}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls()
+        sketch.precision = state["precision"]
+        sketch.size = 1 << sketch.precision
+        sketch.registers = bytearray.fromhex(state["registers"])
+        sketch.error = 1.04 / math.sqrt(sketch.size)
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Finds the most frequent items (for example top URLs) while keeping
+    only a fixed number of counters.
+
+    error is the largest overestimate allowed, as a share of all
+    counted items: with error=0.001 it keeps 1000 counters, every item
+    seen more often than 0.1% of the time is guaranteed to be tracked,
+    and a reported count is never lower than the real count and at most
+    0.1% of the total above it.
+
+    Works like a Counter for the parts the reports use:
+    add(item), update(other) to merge, and most_common(n).
+    """
+
+    def __init__(self, error=0.001):
+        self.error = error
+        self.capacity = math.ceil(1 / error)
+        self.counts = {}
+        self.total = 0
+
+        # (count, item) pairs used to find the smallest counter.
+        # Counts only grow, so an entry can be out of date (too low),
+        # it is then fixed when it reaches the top of the heap.
+        self.heap = []
+
+    def add(self, item):
+        self.total += 1
+
+        if item in self.counts:
+            self.counts[item] += 1
+            return
+
+        if len(self.counts) < self.capacity:
+            self.counts[item] = 1
+            heapq.heappush(self.heap, (1, item))
+            return
+
+        # Replace the item with the smallest count. The new item takes
+        # over that count, which is where the overestimate comes from.
+        smallest, old_item = self.pop_smallest()
+        del self.counts[old_item]
+        self.counts[item] = smallest + 1
+        heapq.heappush(self.heap, (smallest + 1, item))
+
+    def pop_smallest(self):
+        while True:
+            count, item = heapq.heappop(self.heap)
+
+            if self.counts[item] == count:
+                return count, item
+
+            heapq.heappush(self.heap, (self.counts[item], item))
+
+    def minimum(self):
+        """
+        Count that an item not being tracked could at most have.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+
+        count, item = self.pop_smallest()
+        heapq.heappush(self.heap, (count, item))
+        return count
+
+    def update(self, other):
+        """
+        Merges another summary into this one, like Counter.update.
+        An item missing from one side may still have been seen there,
+        up to that side's minimum count, so that is added to keep the
+        "never too low" guarantee.
+        """
+        if other.capacity != self.capacity:
+            raise ValueError("Cannot merge Space-Saving summaries with different error bounds.")
+
+        own_minimum = self.minimum()
+        other_minimum = other.minimum()
+
+        merged = {}
+
+        for item, count in self.counts.items():
+            merged[item] = count + other.counts.get(item, other_minimum)
+
+        for item, count in other.counts.items():
+            if item not in merged:
+                merged[item] = count + own_minimum
+
+        # Keep the largest counters, ties stay in first seen order
+        kept = sorted(merged.items(), key=lambda pair: -pair[1])[:self.capacity]
+
+        self.counts = dict(kept)
+        self.heap = [(count, item) for item, count in kept]
+        heapq.heapify(self.heap)
+        self.total += other.total
+
+    def most_common(self, n=None):
+        ranked = sorted(self.counts.items(), key=lambda pair: -pair[1])
+        return ranked if n is None else ranked[:n]
+
+    def max_overestimate(self):
+        """
+        Largest amount any reported count can be above the real one.
+        """
+        return math.floor(self.error * self.total)
+
+    def to_state(self):
+        return {"error": self.error, "total": self.total, "counts": self.counts}
+
+    @classmethod
+    def from_state(cls, state):
+        summary = cls(state["error"])
+        summary.total = state["total"]
+        summary.counts = dict(state["counts"])
+        summary.heap = [(count, item) for item, count in summary.counts.items()]
+        heapq.heapify(summary.heap)
+        return summary
@@ -0,0 +1,111 @@
+import os
+import json
+
+
+class SpillList:
+    """
+    List-like container with bounded memory use.
+
+    Items are appended to an in-memory buffer. When the buffer holds
+    buffer_size items it is written to a JSON Lines file and cleared,
+    so memory use stays the same no matter how many items are stored.
+    Iterating streams the items back from the file, followed by the
+    ones still in the buffer, in the order they were appended.
+
+    Only append, extend, len() and iteration are supported, which is
+    everything the reports need.
+    """
+
+    def __init__(self, path, buffer_size=10000, decode=None):
+        self.path = path
+        self.buffer_size = buffer_size
+
+        # decode turns a value loaded from JSON back into the stored item,
+        # for example a list back into a tuple
+        self.decode = decode
+
+        self.buffer = []
+        self.spilled = 0
+
+        # The file is only created on the first flush, which also
+        # overwrites anything left over from an earlier run
+        self.started = False
+
+    def append(self, item):
+        self.buffer.append(item)
+
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def flush(self):
+        """
+        Writes the buffered items to the file.
+        """
+        if not self.buffer:
+            return
+
+        with open(self.path, "a" if self.started else "w", encoding="utf-8") as file:
+            for item in self.buffer:
+                file.write(json.dumps(item) + "\n")
+
+        self.started = True
+        self.spilled += len(self.buffer)
+        self.buffer = []
+
+    def __len__(self):
+        return self.spilled + len(self.buffer)
+
+    def __iter__(self):
+        if self.spilled:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for number, line in enumerate(file):
+                    # Ignore anything written after a restored checkpoint
+                    if number >= self.spilled:
+                        break
+
+                    item = json.loads(line)
+                    yield self.decode(item) if self.decode else item
+
+        # Copy so appending while iterating does not change this loop
+        yield from list(self.buffer)
+
+    def checkpoint(self):
+        """
+        Flushes the buffer and returns what is needed to restore
+        the list later: the number of items and the file size.
+        """
+        self.flush()
+
+        size = os.path.getsize(self.path) if self.started else 0
+
+        return {"path": self.path, "count": self.spilled, "size": size}
+
+    def restore(self, state):
+        """
+        Continues from a checkpoint() result. Items written to the file
+        after the checkpoint was taken are cut off.
+        """
+        self.buffer = []
+        self.spilled = state["count"]
+        self.started = self.spilled > 0
+
+        if self.started:
+            with open(self.path, "r+b") as file:
+                file.truncate(state["size"])
+
+    def clear(self):
+        """
+        Removes all items and deletes the file.
+        """
+        self.buffer = []
+        self.spilled = 0
+        self.started = False
+
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass